@@ -10,14 +10,28 @@ import time
 import os
 import re
 import shutil
+import tempfile
 from tempfile import mkstemp
 import database
 import socket
+import hashlib
+import mmap
+import itertools
+import array
+import multiprocessing
+import threading
+import sqlite3
+import subprocess
+import signal
+import Queue
+import atexit
+import numpy
+from collections import OrderedDict, namedtuple, deque
 from datetime import datetime
 
-#define some logging
+#define some logging - only the main process starts a fresh log, pool workers re-importing the module on Windows append to it
 log_file = __file__.split('.')[0].split('/')[-1] + '.log'
-logging.basicConfig(format='%(asctime)s %(message)s', filename=log_file, level=logging.DEBUG, filemode='w')
+logging.basicConfig(format='%(asctime)s %(message)s', filename=log_file, level=logging.DEBUG, filemode='w' if multiprocessing.current_process().name == 'MainProcess' else 'a')
 
 class Avalanche():
     """
@@ -27,12 +41,13 @@ class Avalanche():
                 avalanche_path: filepath to work with Avalanche config files
                 avalanche_config_filename: Avalanche config.tcl test filename
                 output_dir: the Avalanche results output directory
+                results_store: path of a local SQLite results store (see SQLiteDatabase) - when set results are published to, mapped from and analyzed against it instead of the central database until forwarded (see forward_results)
             }
 
     Class assumes TCL config file has already been built out 
     """
 
-    def __init__(self, avalanche_path="C:\AvalancheExeDir", avalanche_config_filename="config.tcl", output_dir="C:\AvalancheExeDir"):
+    def __init__(self, avalanche_path="C:\AvalancheExeDir", avalanche_config_filename="config.tcl", output_dir="C:\AvalancheExeDir", results_store=None):
         """
         Class initialization
         """
@@ -45,16 +60,27 @@ class Avalanche():
         self.date_time = datetime.now().strftime('%Y%m%d%H%M%S')
         self.test_run = self.hostname + self.date_time
         self.time_stamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-
-    def start(self, trial_mode=False):
+        #open ConfigEditSession, if any - config setters queue their edits on it
+        self._edit_session = None
+        self.results_store = results_store
+        #TestRunResults fetched for analysis - {avalanche_test_name: TestRunResults}
+        self._test_run_results = dict()
+        #TclProcess of the running test, if any - see cancel()
+        self._tcl_process = None
+
+    def start(self, trial_mode=False, timeout=None, inactivity_timeout=None, callback=None):
         """
         Starts Avalanche TCL test case
 
         args = {
                     trial_mode: if 'True', run Avalanche test in trial mode and only run through action list once, else run normal (default)
+                    timeout: seconds the whole test may run before it is killed (default: TCL_TIMEOUT, None for no limit)
+                    inactivity_timeout: seconds tclsh may go without output before it is considered hung and killed (default: TCL_INACTIVITY_TIMEOUT, None for no limit) - leave room for quiet stretches of long soaks
+                    callback: optional callback(line) handed each line of tclsh output as it arrives
                 }
 
-        Navigates to avalanche_path directory and runs 'tchlsh test.tcl'
+        Navigates to avalanche_path directory and runs 'tclsh test.tcl' as a managed subprocess (see TclProcess).
+        Returns the TclRun on success, else raises AssertionError carrying its status, return code and error lines
         """
         #toggle the trial mode bit
         if trial_mode:
@@ -71,16 +97,64 @@ class Avalanche():
             raise AssertionError("[FILE.WARNING]: Unknown directory {0}".format(self.avalanche_path))
 
         #start test
-        logging.info("[AVALANCHE]: Starting Avalanche test...")
-        try:    
-            os.system('tclsh test.tcl')
-        except:
+        if not os.path.isfile("test.tcl"):
             logging.warning("[FILE.WARNING]: Avalanche test.tcl does not exist")
-            raise AssertionError("[FILE.WARNING]: Avalanche test.tcl does not exist".format(self.avalanche_path))
+            raise AssertionError("[FILE.WARNING]: Avalanche test.tcl does not exist")
+        logging.info("[AVALANCHE]: Starting Avalanche test...")
+        self._tcl_process = TclProcess(['tclsh', 'test.tcl'], self.avalanche_path, timeout if timeout is not None else TCL_TIMEOUT,
+                                       inactivity_timeout if inactivity_timeout is not None else TCL_INACTIVITY_TIMEOUT, callback)
+        try:
+            run = self._tcl_process.run()
+        finally:
+            self._tcl_process = None
+        if run.status != TCL_RUN_OK:
+            message = "[AVALANCHE.ERROR]: Avalanche test {0}; return code: {1}; elapsed: {2}s".format(run.status, run.returncode, run.elapsed)
+            if run.errors:
+                message += "; errors: " + " | ".join(run.errors)
+            logging.warning(message)
+            raise AssertionError(message)
+        logging.info("[AVALANCHE]: Avalanche test completed in {0}s".format(run.elapsed))
+        return run
+
+    def cancel(self):
+        """
+        Cancel the running Avalanche test, if any - start() then raises AssertionError with a cancelled status
+        """
+        tcl_process = self._tcl_process
+        if tcl_process:
+            tcl_process.cancel()
     def generate_avalanche_tcl_script(self):
         """
         Generates TCL script from an Avalanche test via test.tcl
         """
+    def edit_config(self):
+        """
+        Opens an edit session on the Avalanche TCL script
+
+        All config setters called while the session is open are queued and applied to config.tcl in a single pass with one atomic replace when the session is committed
+
+            with instance.edit_config():
+                instance.force_reserve_ports(True)
+                instance.set_associations(association_list)
+                instance.set_runtime(time_steady)
+
+        Returns the ConfigEditSession - it is open from here on, so it may also be used without 'with' and committed explicitly via commit() (or dropped via discard())
+        """
+        session = ConfigEditSession(self)
+        self._edit_session = session
+        return session
+
+    def _queue_config_edit(self, edit):
+        """
+        Queue a config.tcl edit on the open edit session, else apply it right away in a session of its own
+        """
+        if self._edit_session:
+            self._edit_session.queue(edit)
+        else:
+            session = ConfigEditSession(self)
+            session.queue(edit)
+            session.commit()
+
     def force_reserve_ports(self, force_reserve=True):
         """
         Modifies the Avalanche TCL script to fore reserve the ports
@@ -89,49 +163,18 @@ class Avalanche():
                     force_reserve: if 'True', set the ReserveForce bit to 1 (default) and force reserve the Avalanche ports, else set bit to 0 to not force reserve
                 }
         """
-        #define file
-        config_file = self.avalanche_abs_config_file
-        #create a temporary file
-        fh, temp_file = mkstemp()
         #set ReserveForce to 1 in config file
         if force_reserve:
             reserve_force_bit = '1'
         else:
             reserve_force_bit = '0'
-        #open config file, make modifications, write to new file
-        with open(temp_file, 'w') as new_file:
-            with open(config_file) as old_file:
-                for line in old_file:
-                    if re.search('ReserveForce\s+\d', line):
-                        new_file.write(re.sub('\d', str(reserve_force_bit), line))
-                        logging.info("[FILE.INFO]: {0}; ReserveForce: {1}".format(self.avalanche_config_filename, force_reserve))
-                    else:
-                        new_file.write(line)
-        #close and move file                    
-        os.close(fh) 
-        shutil.move(temp_file, config_file)
+        self._queue_config_edit(('key', 'ReserveForce', reserve_force_bit, "ReserveForce: {0}".format(force_reserve)))
+
     def set_license_file(self, lic_file):
         """
         Modifies the Avalanche TCL script to set the license file
         """
-        #define config file
-        config_file = self.avalanche_abs_config_file
-        #create a temporary file
-        fh, temp_file = mkstemp()
-        #open config file, make modifications, write to new file
-        with open(temp_file, 'w') as new_file:
-            with open(config_file) as old_file:
-                #set all the configrations to 
-                for line in old_file:
-                    if re.search('License\s+{', line):
-                        new_file.write(re.sub('{.*?}', "{%s}", line) % lic_file)
-                        logging.info('[FILE.INFO]: {0}; License: {1}'.format(self.avalanche_config_filename, lic_file))
-                    else:
-                        new_file.write(line)
-
-        #close and move file                    
-        os.close(fh) 
-        shutil.move(temp_file, config_file) 
+        self._queue_config_edit(('key', 'License', lic_file, "License: {0}".format(lic_file)))
 
     def set_output_dir(self, output_dir=None):
         """
@@ -146,26 +189,7 @@ class Avalanche():
             output_dir = output_dir
         else:
             output_dir = self.output_dir.replace('\\', '/')
-
-        #define config file
-        config_file = self.avalanche_abs_config_file
-        #create a temporary file
-        fh, temp_file = mkstemp()
-        #open config file, make modifications, write to new file
-        with open(temp_file, 'w') as new_file:
-            with open(config_file) as old_file:
-                #set all the configrations to 
-                for line in old_file:
-                    if re.search('OutputDir\s+{', line):
-                        new_file.write(re.sub('{.*?}', "{%s}", line) % output_dir)
-                        logging.info('[FILE.INFO]: {0}; Result Output Directory: {1}'.format(self.avalanche_config_filename, output_dir))
-                    else:
-                        new_file.write(line)
-
-        #close and move file                    
-        os.close(fh) 
-        shutil.move(temp_file, config_file)
-
+        self._queue_config_edit(('key', 'OutputDir', output_dir, "Result Output Directory: {0}".format(output_dir)))
 
     def enable_trial_mode(self, enable_trial_mode=False):
         """
@@ -175,98 +199,235 @@ class Avalanche():
                     enable_trial_run: if 'True', set the Trial run bit to 1 and run test in trial mode, else set bit to 0 and run normal mode (default)
                 }
         """
-        #define file
-        config_file = self.avalanche_abs_config_file
-
         #intialize the enable_trial_bit
         if enable_trial_mode:
             enable_trial_bit = '1'
         else:
             enable_trial_bit = '0'
-
-        #create a temporary file
-        fh, temp_file = mkstemp()
-        #open config file, make modifications, write to new file
-        with open(temp_file, 'w') as new_file:
-            with open(config_file) as old_file:
-                for line in old_file:
-                    if re.search('Trial\s+\d', line):
-                        new_file.write(re.sub('\d', str(enable_trial_bit), line))
-                        logging.info("[FILE.INFO]: {0}; Trial Mode: {1}".format(self.avalanche_config_filename, enable_trial_mode))
-                    else:
-                        new_file.write(line)
-
-        #close and move file                    
-        os.close(fh) 
-        shutil.move(temp_file, config_file) 
+        self._queue_config_edit(('key', 'Trial', enable_trial_bit, "Trial Mode: {0}".format(enable_trial_mode)))
 
     def set_associations(self, associations="all"):
         """
         Modifies the Avalanche TCL script to enables/disable Avalanche associations
 
         args = {
-                    associations: the associaitions to enable [all|list of subnet names]
+                    associations: the associaitions to enable [all|list of subnet names|a single subnet name] - an empty list disables them all
                 }
 
         Sets both userBasedAssociations and globalAssociations for now...
         """
+        if associations == "all":
+            #enable all associations both userBased and global associations
+            self._queue_config_edit(('associations', None))
+        elif isinstance(associations, basestring):
+            #a single subnet name rather than a list of its characters
+            self._queue_config_edit(('associations', [associations]))
+        else:
+            #disable all associations and then enable the ones in the list - both happen in the same pass
+            self._queue_config_edit(('associations', list(associations)))
 
-        #define config file
-        config_file = self.avalanche_abs_config_file
-        #create a temporary file
-        fh, temp_file = mkstemp()
+    def get_results(self, dir_list, my_subnet="10.213.", metrics=None, output_dir=None, processes=1, use_mmap=False, use_cache=True):
+        """
+        Parse the Avalanche generated client side hostStats.csv files into a VlanStatsTable
 
-        if associations == "all":
-            #open config file, make modifications, write to new file
-            with open(temp_file, 'w') as new_file:
-                with open(config_file) as old_file:
-                    #enable all associations both userBased and global associations
-                    for line in old_file:
-                        if re.search('.client.userBasedAssociations.association\(\d+\).enabled', line) or re.search('.client.globalAssociations.association\(\d+\).enabled', line):
-                            new_file.write(re.sub('{.*?}', "{true}", line))
-                        else:
-                            new_file.write(line)
-                    logging.info("[FILE.INFO]: {0}; Associations enabled: {1}".format(self.avalanche_config_filename, assocations.lower()))
+        args = {
+                    dir_list: list of Avalanche generated client result directories containing hostStats.csv files (e.g. client-subtest_0_core1)
+                    my_subnet: the users subnet (10.213.*) - only VLAN blocks containing it are kept
+                    metrics: list of hostStats.csv column names to extract (default: DEFAULT_METRICS)
+                    output_dir: the location where the Avalanche results files live (e.g. C:/AvalancheExeDir) this + '/results' + dir_list gives desired path containing hostStats.csv
+                    processes: number of worker processes parsing client directories concurrently, at most one per directory (default: 1 - parses in this process; None for one per CPU).
+                               On Windows the workers re-import the calling script, which then needs an if __name__ == '__main__': guard, and cannot be started from an embedded interpreter
+                    use_mmap: if 'True', scan the files through mmap for flat memory use on very large hostStats.csv files (see iter_vlan_blocks)
+                    use_cache: if 'True' (default), reuse the parsed results cached next to unchanged hostStats.csv files (see parse_client_results)
+                }
+
+        Each Avalanche core writes its own client directory so with processes > 1 the hostStats.csv files are parsed concurrently in a process pool.
+        Returns one table of all the client directories merged in dir_list order - slot/pon/port are left at -1 until mapped (see iter_results)
+        """
+        tables = [table for client_results, table in self.iter_results(dir_list, my_subnet, metrics, output_dir, processes, use_mmap, use_cache)]
+        return concat_vlan_stats_tables(tables, metrics)
+
+    def iter_results(self, dir_list, my_subnet="10.213.", metrics=None, output_dir=None, processes=1, use_mmap=False, use_cache=True):
+        """
+        Parse the Avalanche generated client side hostStats.csv files, yielding a (hostStats.csv path, VlanStatsTable) per client directory as soon as it is parsed
+
+        Same args as get_results - with processes > 1 the files are parsed concurrently in a process pool and handed back in dir_list order
+        """
+        results_dir = self._results_dir(output_dir)
+
+        #build the absolute path to each hostStats.csv file
+        jobs = [(results_dir + "/" + filename + "/hostStats.csv", my_subnet, metrics, use_mmap, use_cache) for filename in dir_list]
+        if processes is None:
+            processes = multiprocessing.cpu_count()
+        #a single directory is parsed right here
+        processes = max(1, min(processes, len(jobs)))
+
+        if processes > 1:
+            pool = multiprocessing.Pool(processes)
+            try:
+                #imap hands the tables back in job order so the merge is deterministic
+                for job, table in itertools.izip(jobs, pool.imap(_parse_client_results_job, jobs)):
+                    logging.info("[AVALANCHE.RESULTS]: {0}; VLANs: {1}".format(job[0], len(table)))
+                    yield job[0], table
+                pool.close()
+            finally:
+                #stops the workers early when the caller stops iterating or parsing failed
+                pool.terminate()
+                pool.join()
         else:
-            #open config file, make modifications, write to new file
-            with open(temp_file, 'w') as new_file:
-                with open(config_file) as old_file:
-                    #disable all associations both userBased and global associations
-                    for line in old_file:
-                        if re.search('.client.userBasedAssociations.association\(\d+\).enabled', line) or re.search('.client.globalAssociations.association\(\d+\).enabled', line):
-                            new_file.write(re.sub('{.*?}', "{false}", line))
-                        else:
-                            new_file.write(line)
-
-            #close and move file                    
-            os.close(fh) 
-            shutil.move(temp_file, config_file) 
-
-            for association in association_list: 
-                #create a temporary file
-                fh, temp_file = mkstemp()
-                #open config file, make modifications, write to new file
-                with open(temp_file, 'w') as new_file:
-                    with open(config_file) as old_file:
-                        #enable associations in list both userBased and global associations
-                        for line in old_file:
-                            if re.search('.clientSubnet\s+{%s}' % association, line):
-                                #write .clientSubnet line to file
-                                new_file.write(line)
-                                #skip to next line
-                                line = old_file.next()
-                                #use regex sub to enable association
-                                new_file.write(re.sub('{.*?}', "{true}", line))
-                            else:
-                                new_file.write(line)
-                #close and move file                    
-                os.close(fh) 
-                shutil.move(temp_file, config_file) 
-
-            #log list of associations to be deleted
-            logging.info("[FILE.INFO]: config.tcl; Associations enabled: {0}".format(associations))
-
-    def get_results_and_post_to_db(self, testbed, dir_list, avalanche_test_name, my_subnet="10.213.", output_dir=None, db_ip="10.21.1.181", db_port=3306, db_database="pqGeneral"):
+            for job in jobs:
+                table = _parse_client_results_job(job)
+                logging.info("[AVALANCHE.RESULTS]: {0}; VLANs: {1}".format(job[0], len(table)))
+                yield job[0], table
+
+    def get_vlan_block(self, filename, vlan, vlan2=0, my_subnet="10.213.", metrics=None, output_dir=None):
+        """
+        Parse a single VLAN's block out of a client side hostStats.csv file through its VlanBlockIndex
+
+        args = {
+                    filename: the Avalanche generated client result directory (e.g. client-subtest_0_core1)
+                    vlan: the outer VLAN
+                    vlan2: the inner VLAN (0 when there is no inner tag)
+                    my_subnet: the users subnet (10.213.*) - sets subnet_match on the block
+                    metrics: list of hostStats.csv column names to extract (default: DEFAULT_METRICS)
+                    output_dir: the location where the Avalanche results files live (e.g. C:/AvalancheExeDir) - '/results' is tacked on
+                }
+
+        Returns the VlanBlock, None if the VLAN is not in that file
+        """
+        results_dir = self._results_dir(output_dir)
+        return get_vlan_block_index(results_dir + "/" + filename + "/hostStats.csv").lookup(vlan, vlan2, my_subnet, metrics)
+
+    def monitor_results(self, my_subnet="10.213.", metrics=None, interval=10.0, output_dir=None):
+        """
+        Get a LiveResultsMonitor following the client side hostStats.csv files while the test runs
+
+        args = {
+                    my_subnet: the users subnet (10.213.*) - only VLAN blocks containing it are reported
+                    metrics: list of hostStats.csv column names to follow (default: DEFAULT_METRICS)
+                    interval: seconds between polls
+                    output_dir: the location where the Avalanche results files live (e.g. C:/AvalancheExeDir) - '/results' is tacked on
+                }
+        """
+        results_dir = self._results_dir(output_dir)
+        return LiveResultsMonitor(results_dir, my_subnet, metrics, interval)
+
+    def get_vlan_mapping(self, testbed, db_ip="10.21.1.181", db_port=3306, db_database="pqGeneral", refresh=False, ttl=None):
+        """
+        Get the VLAN -> slot/pon/port mapping of a testbed from the Vlan_Slot_Pon_Mapping table
+
+        args = {
+                    testbed: the test bed name (e.g. 'FTTP-NODE-1' or 'PQ2E-NODE1_S16')
+                    db_ip: the database server IP address
+                    db_port: the database server port (3306)
+                    db_database: the database to select
+                    refresh: if 'True', reload the mapping from the database even if it is cached
+                    ttl: seconds a loaded mapping is reused for (default: VLAN_MAPPING_TTL)
+                }
+
+        The whole testbed mapping is loaded with one query and cached in memory for the session.
+        With a local results_store the mapping is read from it, copied down from the central database the first time the testbed is used (see sync_vlan_mapping).
+        Returns a dict of (vlan, vlan2) -> (slot, pon, port) plus (vlan, None) -> first mapping of that outer VLAN, for VLANs without an inner tag (port -1 when unset)
+        """
+        ttl = VLAN_MAPPING_TTL if ttl is None else ttl
+        cache_key = (self.results_store, db_ip, db_port, db_database, testbed)
+        cached = _vlan_mappings.get(cache_key)
+        if cached and not refresh and time.time() - cached[0] < ttl:
+            return cached[1]
+
+        db_table_vlan_mapping = "Vlan_Slot_Pon_Mapping"
+        with self._mapping_db_connection(db_ip, db_port, db_database) as db_vlan_map:
+            local = not getattr(db_vlan_map, 'backslash_escapes', True)
+            sql_vlan_map_query = _vlan_mapping_query(testbed, local)
+            query_response = db_vlan_map.db_pull(sql_vlan_map_query)
+        if self.results_store and not query_response[0]:
+            #first use of the testbed on this local store
+            if self.sync_vlan_mapping(testbed, db_ip=db_ip, db_port=db_port, db_database=db_database):
+                with self._mapping_db_connection(db_ip, db_port, db_database) as db_vlan_map:
+                    query_response = db_vlan_map.db_pull(sql_vlan_map_query)
+
+        vlan_mapping = dict()
+        for row in query_response[1]:
+            vlan, vlan2, slot, pon, port = _vlan_mapping_entry(row, local)
+            slot_pon_port = (_to_int(slot), _to_int(pon), _to_int(port))
+            vlan, vlan2 = _to_int(vlan, 0), _to_int(vlan2, 0)
+            vlan_mapping.setdefault((vlan, vlan2 if vlan2 else None), slot_pon_port)
+            vlan_mapping.setdefault((vlan, None), slot_pon_port)
+        if not vlan_mapping:
+            logging.warning("[DB.WARNING]: ENTRY NOT FOUND; {0}".format(sql_vlan_map_query))
+        logging.info("[DB.INFO]: {0}; TestBed: {1}; VLAN mappings loaded: {2}".format(db_table_vlan_mapping, testbed, query_response[0]))
+        _vlan_mappings[cache_key] = (time.time(), vlan_mapping)
+        return vlan_mapping
+
+    def sync_vlan_mapping(self, testbed, db_ip="10.21.1.181", db_port=3306, db_database="pqGeneral"):
+        """
+        Copy a testbed's Vlan_Slot_Pon_Mapping rows from the central database down to the local results_store, replacing what it had
+
+        args = {
+                    testbed: the test bed name (e.g. 'FTTP-NODE-1' or 'PQ2E-NODE1_S16')
+                    db_ip: the central database server IP address
+                    db_port: the central database server port (3306)
+                    db_database: the central database holding Vlan_Slot_Pon_Mapping
+                }
+
+        The rows are read with the same query get_vlan_mapping runs on the central database and stored as explicit
+        TestBed/Vlan/vlan2/Slot/Pon/Port columns (see LOCAL_STORE_SCHEMA), returns the number of rows copied
+        """
+        if not self.results_store:
+            raise AssertionError("[DB.ERROR]: Vlan_Slot_Pon_Mapping; no local results_store to sync to")
+        with self._mapping_db_connection(db_ip, db_port, db_database, local=False) as db_vlan_map:
+            query_response = db_vlan_map.db_pull(_vlan_mapping_query(testbed, False, getattr(db_vlan_map, 'backslash_escapes', True)))
+
+        with self._mapping_db_connection(db_ip, db_port, db_database) as db_local:
+            backslash_escapes = getattr(db_local, 'backslash_escapes', True)
+            db_local.db_push("DELETE FROM `Vlan_Slot_Pon_Mapping` WHERE `TestBed` = {0}".format(_sql_literal(testbed, backslash_escapes)))
+            rows = [(testbed,) + _vlan_mapping_entry(row, False) for row in query_response[1]]
+            for idx in range(0, len(rows), PUBLISH_BATCH_SIZE):
+                values = [_sql_row(row, backslash_escapes) for row in rows[idx:idx + PUBLISH_BATCH_SIZE]]
+                db_local.db_push(LOCAL_VLAN_MAPPING_INSERT + ",".join(values))
+        #the local rows changed under the mapping loaded from them, if any
+        _vlan_mappings.pop((self.results_store, db_ip, db_port, db_database, testbed), None)
+        logging.info("[DB.INFO]: Vlan_Slot_Pon_Mapping; TestBed: {0}; VLAN mappings copied to {1}: {2}".format(testbed, self.results_store, len(rows)))
+        return len(rows)
+
+    def forward_results(self, db_ip="10.21.1.181", db_port=3306, batch_size=None):
+        """
+        Forward the results and goodput rollups published to the local results_store on to the central database in bulk
+
+        args = {
+                    db_ip: the central database server IP address
+                    db_port: the central database server port (3306)
+                    batch_size: rows per multi-row INSERT (default: PUBLISH_BATCH_SIZE)
+                }
+
+        Rows are marked forwarded batch by batch once the central INSERT went through, so an interrupted forward resumes where it stopped.
+        Returns the number of rows forwarded
+        """
+        if not self.results_store:
+            raise AssertionError("[DB.ERROR]: Avalanche_Test_Results; no local results_store to forward from")
+        batch_size = batch_size or PUBLISH_BATCH_SIZE
+        forwarded = 0
+        for db_table, sql_insert in ((AVALANCHE_TEST_RESULTS_TABLE, AVALANCHE_TEST_RESULTS_INSERT), (AVALANCHE_TEST_ROLLUPS_TABLE, AVALANCHE_TEST_ROLLUPS_INSERT)):
+            with self._results_db_connection(db_ip, db_port) as db_local:
+                query_response = db_local.db_pull("SELECT * FROM `{0}` WHERE `forwarded` = 0 ORDER BY `id`".format(db_table))
+            rows = list(query_response[1])
+            if not rows:
+                continue
+
+            with self._results_db_connection(db_ip, db_port, local=False) as db_traffic:
+                if db_table == AVALANCHE_TEST_ROLLUPS_TABLE:
+                    db_traffic.db_push(AVALANCHE_TEST_ROLLUPS_SCHEMA)
+                for idx in range(0, len(rows), batch_size):
+                    batch = rows[idx:idx + batch_size]
+                    #the central database assigns its own ids, drop the local id and forwarded flag
+                    db_traffic.db_push(sql_insert + ",".join(_sql_row((None,) + tuple(row[1:-1])) for row in batch))
+                    with self._results_db_connection(db_ip, db_port) as db_local:
+                        db_local.db_push("UPDATE `{0}` SET `forwarded` = 1 WHERE `id` IN ({1})".format(db_table, ", ".join(str(row[0]) for row in batch)))
+                    forwarded += len(batch)
+                    logging.info("[DB.INFO]: DB FORWARD; {0}; {1} -> {2}; rows: {3}".format(db_table, self.results_store, db_ip, len(batch)))
+        return forwarded
+
+    def get_results_and_post_to_db(self, testbed, dir_list, avalanche_test_name, my_subnet="10.213.", output_dir=None, db_ip="10.21.1.181", db_port=3306, db_database="pqGeneral", processes=1, use_mmap=False, use_cache=True, batch_size=None, pipeline=False, publishers=None, queue_size=None, rollups=True, min_goodput=0.85):
         """
         Retrieve the Avalanche generated results from the client side hostStats.csv files and publish to database
 
@@ -279,13 +440,19 @@ class Avalanche():
                     db_ip: the database server IP address
                     db_port: the database server port (3306)
                     db_database: the database to select
+                    processes: number of worker processes parsing client directories concurrently (see get_results)
+                    use_mmap: if 'True', scan the hostStats.csv files through mmap (see get_results)
+                    use_cache: if 'True' (default), reuse parsed results cached next to unchanged hostStats.csv files (see get_results)
+                    batch_size: rows per multi-row INSERT (see publish_results)
+                    pipeline: if 'True', publish row batches from background threads while the hostStats.csv files are still being parsed (see PublishPipeline)
+                    publishers: number of publisher threads in pipeline mode (default: PUBLISH_THREADS)
+                    queue_size: row batches parsed ahead of the publishers in pipeline mode before parsing blocks (default: PUBLISH_QUEUE_SIZE)
+                    rollups: if 'True' (default), also publish the slot, slot/pon and slot/pon/port goodput rollups of the results (see publish_rollups)
+                    min_goodput: threshold value for the minimum acceptable goodput rate the rollup fail counts are taken against (e.g. 0.85)
                 }
 
-        Open up each client side Avalanche results hostStats.csv file.
-        Parse through the file and grab a list of VLANs.
-        Create a list of VLAN pairs.
-        Extract data from the files that lives in between the VLAN pairs.
-        Connect to database and get VLAN mapping
+        Walk each client side Avalanche results hostStats.csv file once, block by block of VLANs (see iter_vlan_blocks).
+        Map each VLAN block containing my_subnet to its slot/pon/port through the testbed VLAN mapping, loaded once (see get_vlan_mapping)
         Get the below:
             -"Bytes Received"
             -"Goodput[Http] Cumulative Receive"
@@ -295,169 +462,133 @@ class Avalanche():
 
         Connects to MySQLdb using the custom database module - this assumes the user has pre-built vlan mappings in the database
 
+        returns the number of rows published
         """
-        #db initialize variables
-        db_username = "pqgen"
-        db_pwd = "pqgen"
-        #db vlan map pull variables
-        db_table_vlan_mapping = "Vlan_Slot_Pon_Mapping"
-        db_vlan_map = database.Database(db_ip, db_port, db_database, db_username, db_pwd)
-        #db traffic push variables
-        db_database_traffic = "trafficResults" #static for now
-        db_traffic = database.Database(db_ip, db_port, db_database_traffic, db_username, db_pwd)
-        db_avalanche_test_results = "trafficResults"
-        db_table_avalanche_test_results = "Avalanche_Test_Results"
-        sql_fields = "(`id`, `testRun`, `testName`, `vlan`, `vlan2`, `slot`, `pon`, `port`, `bytesReceived`, `goodPutCumRcv`, `goodputAvgRcvRate`, `timestamp`)"
-
-        #connect to database
-        db_vlan_map.db_connect()
-        db_traffic.db_connect()
-        
-        #set output_dir - allow user to set the directory or just use the one initialized with the class.  Also tack on '/results' to give something like "C:/AvalancheExeDir/results"
-        if output_dir:
-            results_dir = output_dir + "/results"
+        #map every VLAN to its slot/pon/port from the testbed's VLAN mapping, VLANs without a mapping entry are dropped
+        vlan_mapping = self.get_vlan_mapping(testbed, db_ip=db_ip, db_port=db_port, db_database=db_database)
+
+        if pipeline:
+            #publish each client directory's rows while the remaining hostStats.csv files are still being parsed
+            publisher = PublishPipeline(self, avalanche_test_name, db_ip, db_port, publishers=publishers, queue_size=queue_size)
+            missing = list()
+            tables = list()
+            try:
+                for client_results, table in self.iter_results(dir_list, my_subnet=my_subnet, output_dir=output_dir, processes=processes, use_mmap=use_mmap, use_cache=use_cache):
+                    table, table_missing = map_slot_pon_port(table, vlan_mapping)
+                    missing.extend(table_missing)
+                    tables.append(table)
+                    for batch in _row_batches(table, batch_size):
+                        publisher.put(batch)
+            except Exception:
+                publisher.abort()
+                raise
+            published = publisher.join()
+            #a slot/pon can be spread over several client directories, the rollups need all of them
+            results = concat_vlan_stats_tables(tables)
         else:
-            results_dir = self.output_dir.replace('\\', '/') + "/results"
+            #parse the hostStats.csv files into a columnar table of the VLAN blocks containing my_subnet
+            results = self.get_results(dir_list, my_subnet=my_subnet, output_dir=output_dir, processes=processes, use_mmap=use_mmap, use_cache=use_cache)
+            results, missing = map_slot_pon_port(results, vlan_mapping)
+            #publish the table - bytes received, goodput cumulative received, goodput avg received rate (bps)
+            published = self.publish_results(results, avalanche_test_name, db_ip=db_ip, db_port=db_port, batch_size=batch_size)
+
+        if missing:
+            logging.warning("[DB.WARNING]: ENTRY NOT FOUND; Vlan_Slot_Pon_Mapping; TestBed: {0}; VLANs: {1}".format(testbed, missing))
+        if rollups:
+            #the raw results are in, a rollup failure only costs the summary
+            try:
+                self.publish_rollups(results, avalanche_test_name, min_goodput=min_goodput, db_ip=db_ip, db_port=db_port)
+            except Exception, e:
+                logging.warning("[DB.WARNING]: DB PUBLISH; {0}; testRun: {1}; rollups not published; {2}".format(AVALANCHE_TEST_ROLLUPS_TABLE, self.test_run, e))
+        return published
+
+    def publish_rollups(self, results, avalanche_test_name, min_goodput=0.85, db_ip="10.21.1.181", db_port=3306):
+        """
+        Publish the goodput rollups of a test run's results to the Avalanche_Test_Rollups summary table
 
-        for filename in dir_list:   
-            #build the absolute path to hostStats.csv file
-            client_results = results_dir + "/" + filename + "/hostStats.csv"
+        args = {
+                    results: VlanStatsTable of the VLAN results with their slot/pon/port mapped (see get_results_and_post_to_db)
+                    avalanche_test_name: the Avalanche test name (e.g. SM040_CSLAG-4_Data_Verification-Avalanche)
+                    min_goodput: threshold value for the minimum acceptable goodput rate the fail counts are taken against (e.g. 0.85)
+                    db_ip: the database server IP address
+                    db_port: the database server port (3306)
+                }
 
-            #initialize vlan lists
-            vlan_list_outer = list()
-            vlan_list_inner = list()
-            vlan_list_pairs_outer = list()
-            vlan_list_pairs_inner = list()
-
-            #open the hostStats.csv file in each directory to retrieve data within blocks of VLANs
-            #client_results_file = open(client_results, 'r')
-            with open(client_results, 'r') as client_results_file:
-                #retrieve a list of VLANs
-                for line in client_results_file:
-                    #get full list of VLANs
-                    if re.search('VLAN,\d+', line):
-                        #print line
-                        #strip the newline character
-                        vlan = line.strip()
-                        #just grab the VLAN value
-                        vlan_outer = vlan.split(",")[1].split("/")[0]
-                        #also going back to grab the inner VLAN
-                        try:
-                            vlan_inner = vlan.split(",")[1].split("/")[1]
-                        except:
-                            vlan_inner = "NULL"
-                        vlan_list_outer.append(vlan_outer)
-                        vlan_list_inner.append(vlan_inner)
-                    
-                    else:
-                        pass
-       
-            #printing list for sanity
-            #print vlan_list
+        One row per slot, slot/pon and slot/pon/port (level 'slot', 'pon' and 'port', the columns below the level are NULL) with the VLAN count,
+        fail count, total bytes received, goodput sum and min percent goodput (see goodput_rollups), so chassis level checks read a few rows instead of every VLAN.
+        The central table is created on first use if it is missing (see AVALANCHE_TEST_ROLLUPS_SCHEMA).
+        Returns the number of rollup rows published
+        """
+        min_goodput = min_goodput * 100
+        values = list()
+        for level, columns in ROLLUP_LEVELS:
+            for key, rollup in sorted(goodput_rollups(results, columns, min_goodput).items()):
+                slot_pon_port = (tuple(value if value >= 0 else None for value in key) + (None,) * 3)[:3]
+                values.append((None, self.test_run, avalanche_test_name, level) + slot_pon_port + (rollup['vlans'], rollup['failed'], rollup['bytes_received'], rollup['goodput'], rollup['min_goodput'], min_goodput, self.time_stamp))
+        if not values:
+            return 0
+
+        with self._results_db_connection(db_ip, db_port) as db_traffic:
+            backslash_escapes = getattr(db_traffic, 'backslash_escapes', True)
+            if backslash_escapes:
+                db_traffic.db_push(AVALANCHE_TEST_ROLLUPS_SCHEMA)
+            for idx in range(0, len(values), PUBLISH_BATCH_SIZE):
+                db_traffic.db_push(AVALANCHE_TEST_ROLLUPS_INSERT + ",".join(_sql_row(row, backslash_escapes) for row in values[idx:idx + PUBLISH_BATCH_SIZE]))
+        logging.info("[DB.INFO]: DB PUBLISH; {0}; testRun: {1}; rollups: {2}".format(AVALANCHE_TEST_ROLLUPS_TABLE, self.test_run, len(values)))
+        return len(values)
+
+    def get_rollups(self, avalanche_test_name, level="slot", db_ip="10.21.1.181", db_port=3306):
+        """
+        Get this test run's published goodput rollups of one level ('slot', 'pon' or 'port')
 
-            #get a list of VLAN pairs ~ [[1,2], [2,3], [3,4], ... [n,m], [m, m+1]]
-            for n in range(len(vlan_list_outer)):
-                try:
-                    vlan_list_pairs_outer.append([vlan_list_outer[n], vlan_list_outer[n+1]])
-                    vlan_list_pairs_inner.append([vlan_list_inner[n], vlan_list_inner[n+1]])
-                except:
-                    #handle if run into an unique number of VLANs 
-                    vlan_list_pairs_outer.append([vlan_list_outer[n], "NULL"])
-                    vlan_list_pairs_inner.append([vlan_list_inner[n], "NULL"])
-
-            # #printing vlan pair list for sanity
-            # print len(vlan_list_outer)
-            # print vlan_list_pairs
-
-
-            #read the Avalanche client results file into memory - may not need to open file twice
-            client_results_file = open(client_results, 'r')
-            file_contents = client_results_file.read()
-
-            #temp_count = 0
-            #print my_subnet
-            for vlan_pair_outer, vlan_pair_inner in zip(vlan_list_pairs_outer, vlan_list_pairs_inner):
-
-                #get start and stop VLAN
-                vlan_start_outer = vlan_pair_outer[0]
-                vlan_stop_outer = vlan_pair_outer[1]
-                #get this for inner VLAN if exists
-                vlan_start_inner = vlan_pair_inner[0]
-
-                #get block of data between VLANs for each VLAN pair
-                vlan_block = re.findall("VLAN,{0}(.*?)VLAN,{1}".format(vlan_start_outer, vlan_stop_outer), file_contents, re.DOTALL|re.MULTILINE)
-                #print vlan_block
-                #break
-                
-                #check to see if my_subnet is found in the VLAN block, if so, pull VLAN mapping from db, else skip to the next pair
-            
-                #still may want to sift down to just get the data block minus the headers
-                for element in vlan_block:
-                    if my_subnet in element:
-                        #print vlan_block
-                        #temp_count += 1
-                        #determine valid VLANs
-                        start_vlan_01 = vlan_start_outer
-                        start_vlan_02 = vlan_start_inner
-                        # print start_vlan_01
-                        # print start_vlan_02
-                        #perform VLAN mapping db retrieval for the corresponding VLANs
-                        if start_vlan_02 == "NULL":
-                            sql_vlan_map_query = "SELECT * FROM {0} WHERE `TestBed` like '{1}' AND `Vlan` LIKE {2}".format(db_table_vlan_mapping, testbed, start_vlan_01)
-                            #print sql_vlan_map_query
-                        else:
-                            sql_vlan_map_query = "SELECT * FROM {0} WHERE `TestBed` like '{1}' AND `Vlan` LIKE {2} AND `vlan2` LIKE {3}".format(db_table_vlan_mapping, testbed, start_vlan_01, start_vlan_02)
-                            #print sql_vlan_map_query
-
-                        #get the row count and query response
-                        query_response = db_vlan_map.db_pull(sql_vlan_map_query)
-                        #print "Row count: " + query_response[0]
-                        #print "SQL Response: " + query_response[1]
-                        if query_response[1]:
-                            sql_response = query_response[1][0]
-                            #print sql_response
-                        else:
-                            logging.warning("[DB.WARNING]: ENTRY NOT FOUND; {0}".format(sql_vlan_map_query))
-
-                        #query SQL response to extract slot, pon, port, etc
-                        slot = sql_response[3]
-                        pon = sql_response[4]
-                        port = sql_response[9]
-                        
-
-                        #grab the statistics - bytes received, goodput cumulative received, goodput avg received rate (bps)
-                        vlan_block_list = vlan_block[0].split(",")
-                        base = 712 * 2
-                        bytes_received = vlan_block_list[base + 9]
-                        goodput_cum_received = vlan_block_list[base + 249]
-                        goodput_avg_received_rate = vlan_block_list[base + 250]
-
-                        #printing results for sanity
-                        # print "bytes received: " + bytes_received
-                        # print "goodput cumulative received: " + goodput_cum_received
-                        # print "goodput avg received rate (bps): " + goodput_avg_received_rate
-
-                        #check if inner tag is defined for publishing to results db -----> figure out what to do with port 'None'/Null val
-                        if start_vlan_02 == "NULL":
-                            values = ('0', self.test_run, avalanche_test_name, start_vlan_01, '0', str(slot), str(pon), str(port), bytes_received, goodput_cum_received, goodput_avg_received_rate, self.time_stamp) 
-
-                        else:
-                            values = ('0', self.test_run, avalanche_test_name, start_vlan_01, start_vlan_02, str(slot), str(pon), str(port), bytes_received, goodput_cum_received, goodput_avg_received_rate, self.time_stamp) 
-
-                        #publish data to db
-                        sql_query_push = "INSERT INTO `{0}`.`{1}` {2} VALUES {3}".format(db_avalanche_test_results, db_table_avalanche_test_results, sql_fields, values)
-                        logging.info("[DB.INFO]: DB PUBLISH; VALUES: {0}".format(values))
-                        db_traffic.db_push(sql_query_push)
+        Returns {(slot,) | (slot, pon) | (slot, pon, port): dict of 'vlans', 'failed', 'bytes_received', 'goodput', 'min_goodput' and 'expected_goodput'}
+        """
+        columns = dict(ROLLUP_LEVELS)[level]
+        with self._results_db_connection(db_ip, db_port) as db_traffic:
+            backslash_escapes = getattr(db_traffic, 'backslash_escapes', True)
+            sql_query = "SELECT * FROM `{0}` WHERE {1} AND `level` = {2}".format(AVALANCHE_TEST_ROLLUPS_TABLE, _results_filter(self.test_run, avalanche_test_name, "sm", backslash_escapes=backslash_escapes), _sql_literal(level, backslash_escapes))
+            logging.info("[DB.RESULTS]: SQL QUERY: {0}".format(sql_query))
+            query_response = db_traffic.db_pull(sql_query)
+
+        rollups = dict()
+        for row in query_response[1]:
+            key = tuple(_to_int(value) for value in row[4:7])[:len(columns)]
+            rollups[key] = {
+                'vlans': _to_int(row[7], 0),
+                'failed': _to_int(row[8], 0),
+                'bytes_received': None if row[9] is None else float(row[9]),
+                'goodput': None if row[10] is None else float(row[10]),
+                'min_goodput': None if row[11] is None else float(row[11]),
+                'expected_goodput': None if row[12] is None else float(row[12]),
+            }
+        return rollups
 
-                    else:
-                        #my_subnet not found in block
-                        pass
+    def get_test_run_results(self, avalanche_test_name, refresh=False, db_ip="10.21.1.181", db_port=3306):
+        """
+        Get this test run's Avalanche_Test_Results rows as a TestRunResults, fetched with one query and then kept in memory
 
-        #close database
-        db_vlan_map.db_close()
-        db_traffic.db_close()
+        args = {
+                    avalanche_test_name: the Avalanche test name (e.g. SM040_CSLAG-4_Data_Verification-Avalanche)
+                    refresh: if 'True', fetch the rows again even if they were already fetched
+                    db_ip: the database server IP address
+                    db_port: the database server port (3306)
+                }
 
-    def analyze_goodput(self, avalanche_test_name, min_goodput=0.85, mode="", slot="", pon="", summary_txt_file_path="C:/AvalancheExeDir/Summary_Results.txt", overwrite=True):
+        Publishing more results for the test name drops the rows kept for it
+        """
+        results = self._test_run_results.get(avalanche_test_name)
+        if results is None or refresh:
+            with self._results_db_connection(db_ip, db_port) as db_traffic:
+                sql_filter = _results_filter(self.test_run, avalanche_test_name, "sm", backslash_escapes=getattr(db_traffic, 'backslash_escapes', True))
+                sql_query = "SELECT * FROM `Avalanche_Test_Results` WHERE {0} ORDER BY `vlan`".format(sql_filter)
+                logging.info("[DB.RESULTS]: SQL QUERY: {0}".format(sql_query))
+                query_response = db_traffic.db_pull(sql_query)
+            results = TestRunResults(self.test_run, avalanche_test_name, vlan_stats_table_from_results(query_response[1]))
+            self._test_run_results[avalanche_test_name] = results
+            logging.info("[DB.RESULTS]: testRun: {0}; testName: {1}; rows: {2}; slots: {3}; pons: {4}".format(self.test_run, avalanche_test_name, len(results), len(results.slots), len(results.pons)))
+        return results
+
+    def analyze_goodput(self, avalanche_test_name, min_goodput=0.85, mode="", slot="", pon="", summary_txt_file_path="C:/AvalancheExeDir/Summary_Results.txt", overwrite=True, server_side=False, refresh=False, worst=10):
         """
         Analzye the Avalanche test results goodput
 
@@ -467,8 +598,13 @@ class Avalanche():
                     summary_txt_file_path: location to generate the summary results text file (e.g. C:/AvalancheExeDir)
                     min_goodput: threshold value for the minimum acceptable goodput rate (e.g. 0.85)
                     overwrite: if True overwrite the Summary_Results.txt file; else, append
+                    server_side: if 'True', have the database compute the goodput and pass/fail counts and only fetch the failing VLANs - the summary lists the failures plus a pass/fail count line
+                    refresh: if 'True', fetch the test run from the database again instead of reusing the rows already fetched (see get_test_run_results)
+                    worst: number of lowest goodput VLANs listed after the goodput statistics (see goodput_statistics)
                 }
 
+        Returns a (VLANs, passed, failed) count tuple
+
         #fetch results from db
         #perform calculations to get pass/fail values and return/print out/log this information
         #build out summary results text file
@@ -498,121 +634,269 @@ class Avalanche():
         #db initialize variables - this needs to be more global/encrypted
         db_ip = "10.21.1.181"
         db_port = 3306
-        db_username = "pqgen"
-        db_pwd = "pqgen"
         #db Avalanche result pull variables
         db_database_traffic = "trafficResults"
         db_table_avalanche_test_results = "Avalanche_Test_Results"
-        db_traffic = database.Database(db_ip, db_port, db_database_traffic, db_username, db_pwd)
 
-        #connect to db
-        db_traffic.db_connect()
-
-        #fetch results from db based on a 'mode'
-        if mode.lower() == "sm":
-            #fetch with test_run id and avalanche_test_name
-            sql_query = "SELECT * FROM `Avalanche_Test_Results` WHERE `testRun` LIKE '{0}' AND `testName` LIKE '{1}' ORDER BY `vlan`".format(self.test_run, avalanche_test_name)
-        elif mode.lower() == "slot":
-            #fetch with test_run id, avalanche_test_name, and slot
-            sql_query = "SELECT * FROM `Avalanche_Test_Results` WHERE `testRun` LIKE '{0}' AND `testName` LIKE '{1}' AND `slot` LIKE '{2}' ORDER BY `vlan`".format(self.test_run, avalanche_test_name, str(slot))
+        min_goodput = min_goodput * 100
+        if server_side:
+            with self._results_db_connection(db_ip, db_port) as db_traffic:
+                #exact match on the indexed test run columns based on a 'mode'
+                sql_filter = _results_filter(self.test_run, avalanche_test_name, mode, slot, pon, getattr(db_traffic, 'backslash_escapes', True))
+                #the database works out the goodput and pass/fail - only the counts and the failing VLANs come back
+                sql_query = GOODPUT_FAILING_QUERY.format(sql_filter, _sql_literal(min_goodput))
+                logging.info("[DB.RESULTS]: SQL QUERY: {0}".format(sql_query))
+                vlan_count, passed = db_traffic.db_pull(GOODPUT_SUMMARY_QUERY.format(sql_filter, _sql_literal(min_goodput)))[1][0]
+                query_response = db_traffic.db_pull(sql_query)
         else:
-        #fetch with test_run id, avalanche_test_name, slot, and pon
-            sql_query = "SELECT * FROM `Avalanche_Test_Results` WHERE `testRun` LIKE '{0}' AND `testName` LIKE '{1}' AND `slot` LIKE '{2}' AND `pon` LIKE '{3}' ORDER BY `vlan`".format(self.test_run, avalanche_test_name, str(slot), str(pon))
-
-        #pull the results and verify you get some - if no results found then raise an assertion and throw log msg
-        logging.info("[DB.RESULTS]: SQL QUERY: {0}".format(sql_query))
-
-        #fetch the data
-        query_response = db_traffic.db_pull(sql_query)
-        row_count = query_response[0]
+            #the test run is fetched once and every mode/slot/pon is sliced out of it in memory
+            results = self.get_test_run_results(avalanche_test_name, refresh=refresh, db_ip=db_ip, db_port=db_port).view(mode, slot, pon)
+            sql_query = "mode: {0}; slot: {1}; pon: {2}".format(mode or "pon", slot, pon)
+            vlan_count = len(results)
 
         #throw an error if no data is retrived from the database
-        #print "Row count: " + query_response[0]
-        if row_count == 0:
+        if not vlan_count:
             logging.warning("[DB.RESULTS]: db: {0}; db_table: {1} - No Avalanche test results records retrieved from using SQL query {2}".format(db_database_traffic, db_table_avalanche_test_results, sql_query))
             AssertionError("[DB.RESULTS]: db: {0}; db_table: {1} - No Avalanche test results records retrieved from using SQL query {2}".format(db_database_traffic, db_table_avalanche_test_results, sql_query))
-        #print "SQL Response: " + str(query_response[1])
 
-        output = list(query_response[1])
-        min_goodput = min_goodput * 100
-        #print output
-        
-         #build out Avalanche summary results txt file
+        if server_side:
+            #(vlan, vlan2, goodput) of the failing VLANs - NULL goodput when nothing was received
+            vlans = [_to_int(row[0], 0) for row in query_response[1]]
+            vlans2 = [_to_int(row[1], 0) for row in query_response[1]]
+            goodput = numpy.array([numpy.nan if row[5] is None else float(row[5]) for row in query_response[1]], dtype=numpy.float64)
+            passed = _to_int(passed, 0)
+        else:
+            vlans, vlans2 = results['vlan'].tolist(), results['vlan2'].tolist()
+            goodput = goodput_percent(results)
+            stats = goodput_statistics(results, goodput, min_goodput, worst)
+            passed = stats['passed']
+
+        #one report line per VLAN, built up front and written out in one go
+        with numpy.errstate(invalid='ignore'):
+            status = numpy.where(goodput >= min_goodput, "[PASS]", "[FAIL]").tolist()
+        report = ["{0} VLAN: {1} - Percent Goodput: {2}%; Expected Percent Goodput: {3}%".format(vlan_status, _vlan_str(outer_vlan, inner_vlan), vlan_goodput, min_goodput)
+                  for vlan_status, outer_vlan, inner_vlan, vlan_goodput in zip(status, vlans, vlans2, goodput.tolist())]
+        if server_side:
+            #only the failing VLANs were listed, sum up the rest
+            report.append("[SUMMARY] VLANs: {0}; Passed: {1}; Failed: {2}; Expected Percent Goodput: {3}%".format(vlan_count, passed, vlan_count - passed, min_goodput))
+        else:
+            report.extend(_goodput_statistics_report(stats, min_goodput))
+        report = "\n".join(report)
+
+        #define config file
+        my_summary_file = summary_txt_file_path
+
+        if overwrite:
+            #then set open options to 'w'
+            summary_options = 'w'
+        else:
+            #then set open options to 'a'
+            summary_options = 'a'
+
+        #build out Avalanche summary results txt file
+        print report
         with open(my_summary_file, summary_options) as summary_file:
-            #write Summary_Results.txt header
-            summary_file.write("##################### Analysis of Avalanche Good Put results per VLAN ######################\n")
-
-            #now loop over each row of data
-            for row in output:
-
-                #do some math to get desired values in Mbps
-                #print row
-                bytes_received = row[8] * 8.0 #Mbps
-                goodput_cum_received = row[9]
-                goodput_avg_received_rate = row[10]
-                test_name = row[2]
-                outer_vlan = row[3]
-                inner_vlan = row[4]
-
-                
-                goodput =  round((goodput_cum_received / bytes_received) * 100, 2) #percent
-                
-
-                # print "min goodput: " + str(min_goodput)
-                # print "Percent goodput: " + str(goodput) + "%"
-                # print "bytes received: " + str(bytes_received)
-                # print "goodput_cum_received: " +  str(goodput_cum_received)
-                # print "goodput_avg_received_rate: " + str(goodput_avg_received_rate)
-                # print "testName: " + str(test_name)
-                # print "outer vlan: " + str(outer_vlan)
-                # print "inner vlan: " + str(inner_vlan)
-
-                #print out pass/fail criteria with info (or just fail) and write to the file or create lists with pass/fail criteria and loop over it and then write it all at the end
-                if goodput >= min_goodput:
-                    #then we passed, not going to print anything but will log the throughput in Summary_Results.txt file
-                    if inner_vlan == 0:
-                        summary_output = "[PASS] VLAN: {0} - Percent Goodput: {1}%; Expected Percent Goodput: {2}%".format(outer_vlan, goodput, min_goodput)
-                    else:
-                        summary_output = "[PASS] VLAN: {0}/{1} - Percent Goodput: {2}%; Expected Percent Goodput: {3}%".format(outer_vlan, inner_vlan, goodput, min_goodput)
-                else:
-                    #we failed, print/log failures
-                    if inner_vlan == 0:
-                        summary_output = "[FAIL] VLAN: {0} - Percent Goodput: {1}%; Expected Percent Goodput: {2}%".format(outer_vlan, goodput, min_goodput)
-                    else:
-                        summary_output = "[FAIL] VLAN: {0}/{1} - Percent Goodput: {2}%; Expected Percent Goodput: {3}%".format(outer_vlan, inner_vlan, goodput, min_goodput)
-                print summary_output
+            summary_file.write("##################### Analysis of Avalanche Good Put results per VLAN ######################\n"
+                               + report + ("\n" if report else "")
+                               + "##################### Analysis of Avalanche Good Put results per VLAN Completed #############\n")
 
-            #define config file
-            my_summary_file = summary_txt_file_path
+        return vlan_count, passed, vlan_count - passed
 
-            if overwrite:
-                #then set open options to 'w'
-                summary_options = 'w'
-            else:
-                #then set open options to 'a'
-                summary_options = 'a'
-            
-            #write Summary_Results.txt footer
-            summary_file.write("##################### Analysis of Avalanche Good Put results per VLAN Completed #############\n")
+    def compare_to_baseline(self, avalanche_test_name, testbed=None, z_threshold=3.0, min_runs=5, min_drop=1.0, update=True, summary_txt_file_path="C:/AvalancheExeDir/Summary_Results.txt", overwrite=False, refresh=False, db_ip="10.21.1.181", db_port=3306):
+        """
+        Compare this test run's per VLAN goodput against the historical baseline of the test on the testbed and flag regressions
+
+        args = {
+                    avalanche_test_name: the Avalanche test name (e.g. SM040_CSLAG-4_Data_Verification-Avalanche)
+                    testbed: the test bed name the baseline is kept for (default: the testbed the instance was created with)
+                    z_threshold: standard deviations below the baseline mean a VLAN's goodput has to drop to be flagged (e.g. 3.0)
+                    min_runs: runs a VLAN's baseline needs before it is compared against
+                    min_drop: percent goodput a VLAN has to drop by at the least to be flagged - keeps very steady baselines from flagging noise
+                    update: if 'True' (default), fold this run's goodput into the baseline afterwards
+                    summary_txt_file_path: location to generate the summary results text file (e.g. C:/AvalancheExeDir)
+                    overwrite: if True overwrite the Summary_Results.txt file; else, append (default)
+                    refresh: if 'True', fetch the test run from the database again instead of reusing the rows already fetched (see get_test_run_results)
+                    db_ip: the database server IP address
+                    db_port: the database server port (3306)
+                }
 
-        #close db session
-        db_traffic.db_connect()
+        The baseline keeps a running count, mean and sum of squared deviations (Welford) of the percent goodput per (testName, testBed, vlan, vlan2)
+        in Avalanche_Goodput_Baseline, so it is read with one indexed query and updated in place without going back over the history.
+        A VLAN regressed when its goodput falls below the baseline's prediction interval at z_threshold by more than min_drop, or it has no goodput at all (see goodput_regressions)
+
+        Returns a dict of 'vlans', 'compared' and 'regressions' counts and 'regressed' - (vlan, vlan2, goodput, baseline mean, baseline std, z score) of the regressed VLANs
+        """
+        testbed = testbed or self.testbed
+        results = self.get_test_run_results(avalanche_test_name, refresh=refresh, db_ip=db_ip, db_port=db_port).results
+        goodput = goodput_percent(results)
+        vlans, vlans2 = results['vlan'].tolist(), results['vlan2'].tolist()
+
+        with self._results_db_connection(db_ip, db_port) as db_traffic:
+            backslash_escapes = getattr(db_traffic, 'backslash_escapes', True)
+            if backslash_escapes:
+                db_traffic.db_push(GOODPUT_BASELINE_SCHEMA)
+            sql_filter = "`testName` = {0} AND `testBed` = {1}".format(_sql_literal(avalanche_test_name, backslash_escapes), _sql_literal(testbed, backslash_escapes))
+            query_response = db_traffic.db_pull("SELECT `vlan`, `vlan2`, `runs`, `mean`, `m2`, `minGoodput`, `maxGoodput`, `lastRun` FROM `{0}` WHERE {1}".format(GOODPUT_BASELINE_TABLE, sql_filter))
+        baseline = GoodputBaseline(query_response[1])
+        runs, mean, m2, minimum, maximum, last_run = baseline.align(vlans, vlans2)
+
+        regressed, std, z_score = goodput_regressions(goodput, runs, mean, m2, z_threshold, min_runs, min_drop)
+        compared = int(numpy.count_nonzero(runs >= min_runs))
+        regressions = numpy.flatnonzero(regressed)
+        comparison = {
+            'vlans': len(goodput),
+            'compared': compared,
+            'regressions': len(regressions),
+            'regressed': [(vlans[idx], vlans2[idx], float(goodput[idx]), float(mean[idx]), float(std[idx]), float(z_score[idx])) for idx in regressions.tolist()],
+        }
+
+        report = ["[REGRESSION] VLAN: {0} - Percent Goodput: {1}%; Baseline: {2:.2f}% +/- {3:.2f}% over {4} runs; z: {5:.2f}".format(_vlan_str(vlan, vlan2), vlan_goodput, baseline_mean, baseline_std, int(runs[idx]), z)
+                  for idx, (vlan, vlan2, vlan_goodput, baseline_mean, baseline_std, z) in zip(regressions.tolist(), comparison['regressed'])]
+        report.append("[SUMMARY] TestBed: {0}; VLANs: {1}; Compared: {2}; Regressions: {3}; z: {4}; Min Runs: {5}".format(testbed, comparison['vlans'], compared, comparison['regressions'], z_threshold, min_runs))
+        report = "\n".join(report)
+        print report
+        with open(summary_txt_file_path, 'w' if overwrite else 'a') as summary_file:
+            summary_file.write("##################### Comparison of Avalanche Good Put results to baseline ######################\n"
+                               + report + "\n"
+                               + "##################### Comparison of Avalanche Good Put results to baseline Completed #############\n")
+
+        if update:
+            #a run is only folded in once - the VLANs that already saw this test run keep their baseline
+            fresh = numpy.array([run != self.test_run for run in last_run], dtype=bool) & ~numpy.isnan(goodput)
+            runs, mean, m2 = welford_update(runs, mean, m2, goodput, fresh)
+            with numpy.errstate(invalid='ignore'):
+                minimum = numpy.where(fresh, numpy.fmin(minimum, goodput), minimum)
+                maximum = numpy.where(fresh, numpy.fmax(maximum, goodput), maximum)
+            rows = [(avalanche_test_name, testbed, vlans[idx], vlans2[idx], int(runs[idx]), float(mean[idx]), float(m2[idx]), float(minimum[idx]), float(maximum[idx]), self.test_run, self.time_stamp)
+                    for idx in numpy.flatnonzero(fresh).tolist()]
+            with self._results_db_connection(db_ip, db_port) as db_traffic:
+                backslash_escapes = getattr(db_traffic, 'backslash_escapes', True)
+                for idx in range(0, len(rows), PUBLISH_BATCH_SIZE):
+                    db_traffic.db_push(GOODPUT_BASELINE_REPLACE + ",".join(_sql_row(row, backslash_escapes) for row in rows[idx:idx + PUBLISH_BATCH_SIZE]))
+            logging.info("[DB.INFO]: DB PUBLISH; {0}; testName: {1}; TestBed: {2}; VLAN baselines updated: {3}".format(GOODPUT_BASELINE_TABLE, avalanche_test_name, testbed, len(rows)))
+        return comparison
+
+    def analyze_time_series(self, dir_list, my_subnet="10.213.", window=None, min_goodput=0.85, dip_fraction=0.5, steady_tolerance=0.1, max_points=None, output_dir=None, summary_txt_file_path="C:/AvalancheExeDir/Summary_Results.txt", overwrite=False):
+        """
+        Analyze the per VLAN goodput over time from the interval samples of the client side hostStats.csv files
 
+        args = {
+                    dir_list: list of Avalanche generated client result directories containing hostStats.csv files (e.g. client-subtest_0_core1)
+                    my_subnet: the users subnet (10.213.*) - only VLANs containing it are analyzed
+                    window: seconds of the rolling window (default: SERIES_WINDOW)
+                    min_goodput: threshold value for the minimum acceptable goodput rate of a rolling window (e.g. 0.85)
+                    dip_fraction: fraction of a VLAN's steady state goodput rate a rolling window dips below (e.g. 0.5)
+                    steady_tolerance: fraction below the steady state goodput rate that still counts as steady (e.g. 0.1)
+                    max_points: points kept of each VLAN's downsampled series (default: SERIES_MAX_POINTS)
+                    output_dir: the location where the Avalanche results files live (e.g. C:/AvalancheExeDir) this + '/results' + dir_list gives desired path containing hostStats.csv
+                    summary_txt_file_path: location to generate the summary results text file (e.g. C:/AvalancheExeDir)
+                    overwrite: if True overwrite the Summary_Results.txt file; else, append (default)
+                }
 
-    def analyze_fairness(self):
+        Catches what the cumulative end of run values hide - e.g. a VLAN that collapsed for 30 seconds mid soak (see vlan_series).
+        VLANs that dipped after reaching steady state, never reached it or ran shorter than the window (insufficient samples) are listed in the summary file.
+        Only the VLANs containing my_subnet are analyzed and only the summary of the listed ones is kept - use iter_vlan_series for the downsampled series.
+        Returns the list of VlanSeries of the listed VLANs, series left None
+        """
+        results_dir = self._results_dir(output_dir)
+        window = window or SERIES_WINDOW
+        min_goodput = min_goodput * 100
+        vlans = 0
+        flagged = list()
+        for filename in dir_list:
+            client_results = results_dir + "/" + filename + "/hostStats.csv"
+            for vlan_series in iter_vlan_series(client_results, my_subnet, window, min_goodput, dip_fraction, steady_tolerance, max_points, subnet_only=True, keep_series=False):
+                vlans += 1
+                if vlan_series.min_goodput is None or vlan_series.dips or vlan_series.steady_state is None:
+                    flagged.append(vlan_series)
+            logging.info("[AVALANCHE.RESULTS]: {0}; VLAN time series: {1}".format(client_results, vlans))
+
+        report = list()
+        dipped = 0
+        for vlan_series in flagged:
+            vlan = _vlan_str(_to_int(vlan_series.vlan, 0), _to_int(vlan_series.vlan2, 0))
+            if vlan_series.min_goodput is None:
+                report.append("[INSUFFICIENT] VLAN: {0} - Samples: {1}; Duration: {2}s; Window: {3}s".format(vlan, vlan_series.samples, vlan_series.duration, window))
+            else:
+                dipped += 1
+                report.append("[DIP] VLAN: {0} - Dips: {1}; Below For: {2}s; Longest: {3}s; Rolling Min Goodput: {4}%; Steady State After: {5}s".format(
+                    vlan, vlan_series.dips, vlan_series.dip_seconds, vlan_series.longest_dip, vlan_series.min_goodput, vlan_series.steady_state))
+        report.append("[SUMMARY] VLANs: {0}; Dipped: {1}; Insufficient Samples: {2}; Window: {3}s; Expected Percent Goodput: {4}%".format(vlans, dipped, len(flagged) - dipped, window, min_goodput))
+        report = "\n".join(report)
+        print report
+        with open(summary_txt_file_path, 'w' if overwrite else 'a') as summary_file:
+            summary_file.write("##################### Analysis of Avalanche Good Put over time per VLAN ######################\n"
+                               + report + "\n"
+                               + "##################### Analysis of Avalanche Good Put over time per VLAN Completed #############\n")
+        return flagged
+
+    def analyze_fairness(self, avalanche_test_name, mode="", slot="", pon="", results=None, metric="Goodput[Http] Ave Receive Rate (bps)", min_fairness=None, summary_txt_file_path="C:/AvalancheExeDir/Summary_Results.txt", overwrite=False, refresh=False):
         """
         Analyze the Avalanche test results fairness
+
+        args = {
+                    avalanche_test_name: the Avalanche test name (e.g. SM040_CSLAG-4_Data_Verification-Avalanche)
+                    mode: same selectors as analyze_goodput - 'sm' the whole test run, 'slot' one slot, default one slot/pon. options: [SM|SLOT]
+                    slot: the slot for mode 'slot' and the default mode
+                    pon: the pon for the default mode
+                    results: VlanStatsTable to analyze instead of the published results (e.g. straight from get_results) - mode/slot/pon are ignored
+                    metric: the per VLAN value compared across subscribers (default: the average goodput receive rate)
+                    min_fairness: minimum acceptable Jain's fairness index (e.g. 0.9) - if set each group is reported as [PASS]/[FAIL]
+                    summary_txt_file_path: location to generate the summary results text file (e.g. C:/AvalancheExeDir)
+                    overwrite: if True overwrite the Summary_Results.txt file; else, append (default - follows analyze_goodput's report)
+                    refresh: if 'True', fetch the test run from the database again instead of reusing the rows already fetched (see get_test_run_results)
+                }
+
+        Jain's fairness index, max/min ratio and coefficient of variation of the metric across the VLANs of the test run, each slot and each PON (see fairness_statistics).
+        The levels reported follow the mode - 'sm' all three, 'slot' the slot and its PONs, default the PON
+
+        Returns {'run'|'slot'|'pon': {group key tuple: fairness statistics dict}} of the levels reported
+        """
+        if results is None:
+            results = self.get_test_run_results(avalanche_test_name, refresh=refresh).view(mode, slot, pon)
+            levels = FAIRNESS_LEVELS if mode.lower() == "sm" else FAIRNESS_LEVELS[1:] if mode.lower() == "slot" else FAIRNESS_LEVELS[2:]
+        else:
+            levels = FAIRNESS_LEVELS
+        if not len(results):
+            logging.warning("[AVALANCHE.RESULTS]: testName: {0}; mode: {1}; slot: {2}; pon: {3} - No Avalanche test results to analyze fairness of".format(avalanche_test_name, mode or "pon", slot, pon))
+
+        fairness = OrderedDict()
+        report = list()
+        for level, columns in levels:
+            fairness[level] = fairness_statistics(results, metric, columns)
+            for key, stats in sorted(fairness[level].items()):
+                if min_fairness is None:
+                    tag = "[FAIRNESS]"
+                else:
+                    tag = "[PASS]" if stats['jain'] >= min_fairness else "[FAIL]"
+                group = "; ".join("{0}: {1}".format(name.upper() if name == "pon" else name.capitalize(), value) for name, value in zip(columns, key)) or "Test Run"
+                report.append("{0} {1} - VLANs: {2}; Jain's Index: {3:.4f}; Max/Min: {4:.4f}; CoV: {5:.4f}; Mean: {6:.2f}".format(tag, group, stats['vlans'], stats['jain'], stats['max_min'], stats['cov'], stats['mean']))
+        if min_fairness is not None:
+            report.append("[SUMMARY] Expected Jain's Index: {0}".format(min_fairness))
+        report = "\n".join(report)
+
+        #build out Avalanche summary results txt file in one write
+        print report
+        with open(summary_txt_file_path, 'w' if overwrite else 'a') as summary_file:
+            summary_file.write("##################### Analysis of Avalanche Fairness results ({0}) ######################\n".format(metric)
+                               + report + ("\n" if report else "")
+                               + "##################### Analysis of Avalanche Fairness results Completed #############\n")
+        return fairness
+
+    def _results_dir(self, output_dir=None):
         """
+        The Avalanche results directory - output_dir (default: the one initialized with the class) + '/results', e.g. "C:/AvalancheExeDir/results"
+        """
+        if output_dir:
+            return output_dir + "/results"
+        return self.output_dir.replace('\\', '/') + "/results"
+
     def get_directories(self, output_dir=None):
         """
         Get a list of directories
         """
         
-        #set output_dir - allow user to set the directory or just use the one initialized with the class.  Also tack on '/results' to give something like "C:/AvalancheExeDir/results"
-        if output_dir:
-            results_dir = output_dir + "/results"
-        else:
-            results_dir = self.output_dir.replace('\\', '/') + "/results"
+        results_dir = self._results_dir(output_dir)
 
         #initialize client results directory name list 
         client_results = list()
@@ -635,10 +919,68 @@ class Avalanche():
         #return list of client results directories
         return client_results
 
-    def publish_results(self):
+    def publish_results(self, results, avalanche_test_name, db_ip="10.21.1.181", db_port=3306, batch_size=None):
         """
         Publish Avalanche test results to database
+
+        args = {
+                    results: VlanStatsTable of the VLAN results with their slot/pon/port mapped (see get_results_and_post_to_db)
+                    avalanche_test_name: the Avalanche test name (e.g. SM040_CSLAG-4_Data_Verification-Avalanche)
+                    db_ip: the database server IP address
+                    db_port: the database server port (3306)
+                    batch_size: rows per multi-row INSERT (default: PUBLISH_BATCH_SIZE)
+                }
+
+        Rows are buffered and flushed as one multi-row INSERT per batch_size rows instead of one INSERT per VLAN.
+        Values are escaped into SQL literals (see _sql_literal) as the database module takes statements only, a missing port is published as NULL
+
+        returns the number of rows published
+        """
+        published = 0
+        with self._results_db_connection(db_ip, db_port) as db_traffic:
+            for batch in _row_batches(results, batch_size):
+                published += self._publish_rows(db_traffic, batch, avalanche_test_name)
+        logging.info("[DB.INFO]: DB PUBLISH; testRun: {0}; published: {1}".format(self.test_run, published))
+        return published
+
+    def _results_db_connection(self, db_ip, db_port, local=True):
+        """
+        Check out a pooled connection to the trafficResults database (see DatabasePool.connection) - the local results_store if there is one, unless local is False
+        """
+        if local and self.results_store:
+            return _database_pool.local_connection(self.results_store)
+        #db initialize variables
+        db_username = "pqgen"
+        db_pwd = "pqgen"
+        db_database_traffic = "trafficResults" #static for now
+        return _database_pool.connection(db_ip, db_port, db_database_traffic, db_username, db_pwd)
+
+    def _mapping_db_connection(self, db_ip, db_port, db_database, local=True):
+        """
+        Check out a pooled connection to the database holding Vlan_Slot_Pon_Mapping - the local results_store if there is one, unless local is False
+        """
+        if local and self.results_store:
+            return _database_pool.local_connection(self.results_store)
+        #db initialize variables
+        db_username = "pqgen"
+        db_pwd = "pqgen"
+        return _database_pool.connection(db_ip, db_port, db_database, db_username, db_pwd)
+
+    def _publish_rows(self, db_traffic, rows, avalanche_test_name):
+        """
+        Publish a batch of VlanStatsTable rows to Avalanche_Test_Results as a single multi-row INSERT, returns the number of rows
         """
+        values = list()
+        for row in rows:
+            vlan, vlan2, slot, pon, port = row[:5]
+            #no port mapped is published as NULL
+            values.append(_sql_row((None, self.test_run, avalanche_test_name, vlan, vlan2, slot, pon, port if port >= 0 else None) + row[5:] + (self.time_stamp,), getattr(db_traffic, 'backslash_escapes', True)))
+        db_traffic.db_push(AVALANCHE_TEST_RESULTS_INSERT + ",".join(values))
+        #the rows fetched for analysis are out of date now
+        self._test_run_results.pop(avalanche_test_name, None)
+        logging.info("[DB.INFO]: DB PUBLISH; Avalanche_Test_Results; testRun: {0}; rows: {1}".format(self.test_run, len(values)))
+        return len(values)
+
     def get_config_files(self, testbed, avalanche_test_name, repo_dir="C:/iTest_4.0/PQ_Production_Project/ConfigurationFiles/Avalanche", license_dir="C:/iTest_4.0/PQ_Production_Project/ConfigurationFiles/Avalanche/Avalanche_License"):
         """
         Get the Avalanche TCL config files from version controlled repository and move them to avalanche_path
@@ -702,7 +1044,6 @@ class Avalanche():
 
             args = {    
                         runtime: the time in seconds to change to
-                        associations: the associaitions to enable [all|list of subnet names]
                         param: the runtime parameter to adjust [Soak|RampUp|RampDown] 
                         loads: if a list is defined then set the runtime properties for those load profiles only, else set the runtime properties for all the loads (including default) - again important on label syntax (if you do not know what this is, you probably want to leave it undefined)
                     }
@@ -710,190 +1051,2198 @@ class Avalanche():
             Allow to change RampUp, Steady Time, RampDown time via arguments with defaults
             It is important to know this only works if the developer of the Avalanche test cases sets the load configuration labels appropriately - strictly using only case insensitive [Soak|Steady Time|RampUp|Ramp Up|RampDown|Ramp Down]
             """
-            #define config file
-            config_file = self.avalanche_abs_config_file
-            #create a temporary file - just noticed this could be happening twice in this case!!!
-            fh, temp_file = mkstemp()
-
-            ###only adjust runtime properties for those load profiles defined###
             if loads:
                 logging.info("[FILE.INFO]: {0}; load config; loads: {1}".format(self.avalanche_config_filename, loads))
-                #loop over all the loads
-                for load in loads:
-                    #create a temporary file
-                    fh, temp_file = mkstemp()
-                    #open config file, make modifications, write to new file
-                    with open(temp_file, 'w') as new_file:
-                        with open(config_file) as old_file:
-                            #find all the load profiles that match
-                            for line in old_file:
-                                if re.search('set\s+loadprofile_handle\s+\[getOrCreateNode\s+\$projectHandle\s+loads\s+%s' % load, line):
-                                    #found a matching load profile
-                                    #write that line
-                                    new_file.write(line)
-                                    while True:
-                                        #get the next line, if it exists
-                                        try:
-                                            line = old_file.next()
-                                        except StopIteration:
-                                            break
-                                        #see if the line deals with loadprofile handling
-                                        if re.search('set\s+loadprofile_handle', line):
-                                            #it does so will break and check to see if it is one of the loads we want
-                                            new_file.write(line)
-                                            break
-                                        else:
-                                            #set RampUp rampTime property
-                                            if "up" in param.lower():
-                                                if re.search('loadprofile_handle\s+-steps.step\(\d+\).label\s+{Ramp\s+Up}', line, re.IGNORECASE) or re.search('loadprofile_handle\s+-steps.step\(\d+\).label\s+{RampUp}', line, re.IGNORECASE):
-                                                    #skip five lines and write them to the file to get to the rampTime property
-                                                    new_file.write(line)
-                                                    line = old_file.next()
-                                                    new_file.write(line)
-                                                    line = old_file.next()
-                                                    new_file.write(line)
-                                                    line = old_file.next()
-                                                    new_file.write(line)
-                                                    line = old_file.next()
-                                                    new_file.write(line)
-                                                    line = old_file.next()
-                                                    #use regex sub to set the rampTime - units: seconds
-                                                    new_file.write(re.sub('{.*?}', "{%s}" % runtime, line))
-                                                    #log the changes
-                                                    logging.info("[FILE.INFO]: config.tcl; load '{0}'; RampUp; Time: {1}".format(load, runtime))
-                                                else:
-                                                    new_file.write(line)
-                                                
-                                            
-                                            #set RampDown rampTime property
-                                            elif "down" in param.lower():
-                                                if re.search('loadprofile_handle\s+-steps.step\(\d+\).label\s+{Ramp\s+Down}', line, re.IGNORECASE) or re.search('loadprofile_handle\s+-steps.step\(\d+\).label\s+{RampDown}', line, re.IGNORECASE):
-                                                    #skip five lines and write them to the file to get to the rampTime property
-                                                    new_file.write(line)
-                                                    line = old_file.next()
-                                                    new_file.write(line)
-                                                    line = old_file.next()
-                                                    new_file.write(line)
-                                                    line = old_file.next()
-                                                    new_file.write(line)
-                                                    line = old_file.next()
-                                                    new_file.write(line)
-                                                    line = old_file.next()
-                                                    #use regex sub to set the rampTime - units: seconds
-                                                    new_file.write(re.sub('{.*?}', "{%s}" % runtime, line))
-                                                    #log the changes
-                                                    logging.info("[FILE.INFO]: config.tcl; load '{0}'; RampDown; Time: {1}".format(load, runtime))
-                                                else:
-                                                    new_file.write(line)
-
-                                            #set Steady State/Soak steadyTime property
-                                            else:
-                                                if re.search('loadprofile_handle\s+-steps.step\(\d+\).label\s+{Soak}', line, re.IGNORECASE) or re.search('loadprofile_handle\s+-steps.step\(\d+\).label\s+{Steady\s+State}', line, re.IGNORECASE) or re.search('loadprofile_handle\s+-steps.step\(\d+\).label\s+{SteadyState}', line, re.IGNORECASE):
-                                                    #skip six lines and write them to the file to get to the steadyTime property
-                                                    new_file.write(line)
-                                                    line = old_file.next()
-                                                    new_file.write(line)
-                                                    line = old_file.next()
-                                                    new_file.write(line)
-                                                    line = old_file.next()
-                                                    new_file.write(line)
-                                                    line = old_file.next()
-                                                    new_file.write(line)
-                                                    line = old_file.next()
-                                                    new_file.write(line)
-                                                    line = old_file.next()
-                                                    #use regex sub to set the rampTime - units: seconds
-                                                    new_file.write(re.sub('{.*?}', "{%s}" % runtime, line))
-                                                    #log the changes
-                                                    logging.info("[FILE.INFO]: config.tcl; load '{0}'; Soak; Time: {1}".format(load, runtime))
-                                                else:
-                                                    new_file.write(line)
-                                else:
-                                    #not a line with matching load profile
-                                    new_file.write(line)
-
-                    #close and move file each time
-                    os.close(fh) 
-                    shutil.move(temp_file, config_file) 
-
-            ####adjust the runtime properties for all the load profiles###
+                loads = list(loads)
+            self._queue_config_edit(('runtime', _runtime_step(param), str(runtime), loads))
+
+    def generate_config_variants(self, matrix, loads=None, cache_dir=None, processes=1, base_config=None):
+        """
+        Generates Avalanche TCL script variants of a base test for every combination of a parameter matrix
+
+        args = {
+                    matrix: dict of parameter -> list of values to sweep; parameters are the set_runtime params [RampUp|Soak|SteadyState|RampDown] and 'associations' with values of 'all' or a list of subnet names (e.g. {'Soak': ['60', '120'], 'associations': [['OctalOLT_Node1_Slot3'], 'all']})
+                    loads: list of load profiles the runtime params apply to, else all the loads (default)
+                    cache_dir: the variant cache directory (default: <system temp dir>/avalanche_variants)
+                    processes: number of worker processes writing variants in parallel (default: 1 - written in this process; see get_results for the Windows caveats of a pool)
+                    base_config: the base config.tcl (default: the class config file)
+                }
+
+        The base config.tcl is parsed once and every variant is built from that model - in a process pool each worker parses it once.
+        Raises AssertionError on a parameter that is not one of VARIANT_PARAMS.
+        Variants are stored under a readable label of the variant plus the sha1 of the base contents and the variant parameters, so a variant that already exists in the cache is never generated again.
+        An associations value of 'all' enables every association, a list (or a single subnet name) enables only those and an empty list disables them all.
+        Returns a list of (variant, filepath) tuples in matrix order, variant being a dict of parameter -> value - copy a filepath over config.tcl to run it
+        """
+        base_config = base_config or self.avalanche_abs_config_file
+        cache_dir = cache_dir or os.path.join(tempfile.gettempdir(), "avalanche_variants")
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        unknown = [param for param in matrix if param not in VARIANT_PARAMS]
+        if unknown:
+            logging.warning("[FILE.WARNING]: Unknown config variant parameter(s): {0}; expected: {1}".format(unknown, VARIANT_PARAMS))
+            raise AssertionError("[FILE.WARNING]: Unknown config variant parameter(s): {0}; expected: {1}".format(unknown, VARIANT_PARAMS))
+        model = load_config_model(base_config)
+
+        #expand the matrix in parameter name order so the variant order is stable
+        params = sorted(matrix.keys())
+        variants = list()
+        jobs = list()
+        for values in itertools.product(*[matrix[param] for param in params]):
+            variant = dict(zip(params, values))
+            edits = list()
+            for param in params:
+                if param == "associations":
+                    subnets = variant[param]
+                    edits.append(('associations', None if subnets == "all" else [subnets] if isinstance(subnets, basestring) else list(subnets)))
+                else:
+                    edits.append(('runtime', _runtime_step(param), str(variant[param]), list(loads) if loads else None))
+            variant_key = hashlib.sha1("{0}:{1}:{2}".format(VARIANT_CACHE_VERSION, model.digest(), repr(edits))).hexdigest()
+            variant_file = os.path.join(cache_dir, "{0}_{1}.tcl".format(_variant_label(params, edits), variant_key))
+            variants.append((variant, variant_file))
+            if not os.path.exists(variant_file):
+                jobs.append((edits, variant_file))
+        logging.info("[FILE.INFO]: {0}; Config variants: {1}; cached: {2}; to generate: {3}".format(base_config, len(variants), len(variants) - len(jobs), len(jobs)))
+
+        #applying the edits and serializing hold the GIL, so spread the variants over processes - each worker parses the base contents once
+        processes = max(1, min(processes, len(jobs)))
+        if processes > 1:
+            pool = multiprocessing.Pool(processes, _init_config_variant_worker, (model.serialize(),))
+            try:
+                pool.map(_write_config_variant_job, jobs)
+                pool.close()
+            finally:
+                pool.terminate()
+                pool.join()
+        else:
+            for edits, variant_file in jobs:
+                _write_config_variant(model, edits, variant_file)
+        return variants
+
+
+class ConfigEditSession():
+    """
+    Avalanche config.tcl edit session
+
+    args = {
+                avalanche: the Avalanche instance owning the config.tcl file
+            }
+
+    Queues config.tcl modifications, applies them to the indexed ConfigModel of the file and commits with a single serialization and atomic replace.
+    When every changed line keeps its byte length (e.g. the ReserveForce/Trial bits) the lines are patched in place through mmap instead - no file copy at all.
+    Edits are applied in the order they were queued so later edits win when they touch the same line.
+    While open (from Avalanche.edit_config() until commit() or discard()) the session is picked up by the Avalanche config setters.
+    Used as a context manager it is committed on exit and discarded on error.
+    """
+
+    def __init__(self, avalanche):
+        """
+        Class initialization
+        """
+        self.avalanche = avalanche
+        self.config_file = avalanche.avalanche_abs_config_file
+        self.config_filename = avalanche.avalanche_config_filename
+        self.edits = list()
+
+    def __enter__(self):
+        self.avalanche._edit_session = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type:
+            self.discard()
+        else:
+            self.commit()
+
+    def queue(self, edit):
+        """
+        Queue an edit tuple - ('key', key, value, log_msg), ('associations', None|subnet list) or ('runtime', step, runtime, loads|None)
+        """
+        self.edits.append(edit)
+
+    def discard(self):
+        """
+        Drop all queued edits without touching config.tcl and close the session
+        """
+        self._close()
+        self.edits = list()
+
+    def _close(self):
+        """
+        Stop the Avalanche config setters from queueing on this session - later setter calls write right away
+        """
+        if self.avalanche._edit_session is self:
+            self.avalanche._edit_session = None
+
+    def commit(self):
+        """
+        Apply all queued edits to the config.tcl model, serialize it once and atomically replace the file, then close the session
+        """
+        self._close()
+        if not self.edits:
+            return
+        #unverified - the fixed width path checks the bytes it writes over itself
+        model = load_config_model(self.config_file, verify=False)
+        #collect the edited lines aside so the cached model stays valid if the write fails
+        changes = model.apply_edits(self.edits)
+        edits, self.edits = self.edits, list()
+        if not changes:
+            logging.info("[FILE.INFO]: {0}; No config changes to write".format(self.config_filename))
+            return
+        if all(len(line) == len(model.lines[idx]) for idx, line in changes.items()):
+            if self._patch(model, changes):
+                return
+            #config.tcl no longer matches the model - reparse it and take the rewrite path
+            logging.warning("[FILE.WARNING]: {0}; Config changed on disk, reparsing".format(self.config_filename))
+            _config_models.pop(model.path, None)
+        #the rewrite puts the whole model over the file - make sure it still holds the file contents
+        verified = load_config_model(self.config_file)
+        if verified is not model:
+            model = verified
+            changes = model.apply_edits(edits, log=False)
+            if not changes:
+                logging.info("[FILE.INFO]: {0}; No config changes to write".format(self.config_filename))
+                return
+        self._rewrite(model, changes)
+
+    def _patch(self, model, changes):
+        """
+        Fixed width fast path - write the changed lines over the old ones in place through mmap
+
+        Returns False without writing anything when the file on disk does not hold the model's lines at their offsets
+        """
+        with open(self.config_file, 'r+b') as config:
+            config_map = mmap.mmap(config.fileno(), 0, access=mmap.ACCESS_WRITE)
+            try:
+                for idx in changes:
+                    offset = model.line_offset(idx)
+                    if config_map[offset:offset + len(model.lines[idx])] != model.lines[idx]:
+                        return False
+                for idx, line in changes.items():
+                    offset = model.line_offset(idx)
+                    config_map[offset:offset + len(line)] = line
+                config_map.flush()
+            finally:
+                config_map.close()
+        model.update(changes)
+        model.stat()
+        logging.info("[FILE.INFO]: {0}; Patched {1} line(s) in place".format(self.config_filename, len(changes)))
+        return True
+
+    def _rewrite(self, model, changes):
+        """
+        Variable width path - serialize the model once and atomically replace config.tcl
+        """
+        data = model.serialize(changes)
+        #write the temporary file next to config.tcl so the final replace is a rename on the same volume
+        fh, temp_file = mkstemp(dir=os.path.dirname(self.config_file) or None)
+        try:
+            with os.fdopen(fh, 'wb') as new_file:
+                new_file.write(data)
+            _atomic_replace(temp_file, self.config_file)
+        except:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            raise
+        #edits only change values so the model index still holds for the new content
+        model.update(changes)
+        model.stat()
+
+
+class ConfigModel():
+    """
+    Indexed model of an Avalanche config.tcl file
+
+    args = {
+                data: the raw config.tcl file contents
+            }
+
+    Parses config.tcl once into its lines plus an index of the lines the Avalanche setters touch:
+        keys: key [ReserveForce|Trial|License|OutputDir] -> line numbers
+        association_lines: line numbers of every userBased/global association enabled property
+        subnets: .clientSubnet name -> line numbers of the enabled property following it
+        loads: load profile name -> step number -> {'label': label, 'line': label line number, 'properties': property -> line number}
+
+    Line byte offsets are indexed on first use so fixed width values can be patched in place.
+    Use load_config_model() to get the cached model of a file rather than building one directly
+    """
+
+    def __init__(self, data):
+        """
+        Class initialization
+        """
+        self.lines = data.splitlines(True)
+        self._digest = hashlib.sha1(data).hexdigest()
+        self._offsets = None
+        self.path = None
+        self.size = None
+        self.mtime = None
+        self.keys = dict()
+        self.association_lines = list()
+        self.subnets = dict()
+        self.loads = OrderedDict()
+        self._parse()
+
+    def _parse(self):
+        steps = None
+        for idx, line in enumerate(self.lines):
+            if 'loadprofile_handle' in line:
+                #start of a new load profile block - loads not created through getOrCreateNode go under None
+                if re.search('set\s+loadprofile_handle', line):
+                    match = re.search(LOAD_PROFILE_REGEX, line)
+                    steps = self.loads.setdefault(match.group(1) if match else None, OrderedDict())
+                    continue
+                match = re.search(STEP_PROPERTY_REGEX, line)
+                if match:
+                    if steps is None:
+                        steps = self.loads.setdefault(None, OrderedDict())
+                    step = steps.setdefault(int(match.group(1)), {'label': None, 'line': None, 'properties': dict()})
+                    if match.group(2) == 'label':
+                        step['label'] = match.group(3)
+                        step['line'] = idx
+                    else:
+                        step['properties'][match.group(2)] = idx
+            elif 'ssociation' in line:
+                if re.search(ASSOCIATION_ENABLED_REGEX, line):
+                    self.association_lines.append(idx)
+                match = re.search('.clientSubnet\s+{(.*?)}', line)
+                if match and idx + 1 < len(self.lines):
+                    #the enabled property follows the .clientSubnet line
+                    self.subnets.setdefault(match.group(1), list()).append(idx + 1)
             else:
-                if "up" in param.lower():
-                    logging.info("[FILE.INFO]: {0}; load config; RampUp; Time: {1}".format(self.avalanche_config_filename, runtime))
-                    #open config file, make modifications, write to new file
-                    with open(temp_file, 'w') as new_file:
-                        with open(config_file) as old_file:
-                            #set the rampTime for the available load profiles matching under {Ramp Up} or {RampUp} - case insensitive
-                            for line in old_file:
-                                if re.search('loadprofile_handle\s+-steps.step\(\d+\).label\s+{Ramp\s+Up}', line, re.IGNORECASE) or re.search('loadprofile_handle\s+-steps.step\(\d+\).label\s+{RampUp}', line, re.IGNORECASE):
-                                    #skip five lines and write them to the file to get to the rampTime property
-                                    new_file.write(line)
-                                    line = old_file.next()
-                                    new_file.write(line)
-                                    line = old_file.next()
-                                    new_file.write(line)
-                                    line = old_file.next()
-                                    new_file.write(line)
-                                    line = old_file.next()
-                                    new_file.write(line)
-                                    line = old_file.next()
-                                    #use regex sub to set the rampTime - units: seconds
-                                    new_file.write(re.sub('{.*?}', "{%s}" % runtime, line))
-                                else:
-                                    new_file.write(line)
-
-                elif "down" in param.lower():
-                    logging.info("[FILE.INFO]: {0}; load config; RampDown; Time: {1}".format(self.avalanche_config_filename, runtime))
-                    #open config file, make modifications, write to new file
-                    with open(temp_file, 'w') as new_file:
-                        with open(config_file) as old_file:
-                            #set the rampTime for the available load profiles matching under {Ramp Down} or {RampDown} - case insensitive
-                            for line in old_file:
-                                if re.search('loadprofile_handle\s+-steps.step\(\d+\).label\s+{Ramp\s+Down}', line, re.IGNORECASE) or re.search('loadprofile_handle\s+-steps.step\(\d+\).label\s+{RampDown}', line, re.IGNORECASE):
-                                    #skip five lines and write them to the file to get to the rampTime property
-                                    new_file.write(line)
-                                    line = old_file.next()
-                                    new_file.write(line)
-                                    line = old_file.next()
-                                    new_file.write(line)
-                                    line = old_file.next()
-                                    new_file.write(line)
-                                    line = old_file.next()
-                                    new_file.write(line)
-                                    line = old_file.next()
-                                    #use regex sub to set the rampTime - units: seconds
-                                    new_file.write(re.sub('{.*?}', "{%s}" % runtime, line))
-                                else:
-                                    new_file.write(line)
+                for key, regex in CONFIG_KEY_REGEX.items():
+                    if key in line and re.search(regex, line):
+                        self.keys.setdefault(key, list()).append(idx)
+
+    def apply_edits(self, edits, log=True):
+        """
+        Resolve queued edit tuples through the index - returns the changed lines {line number: new line} without modifying the model
+        """
+        changes = dict()
+        def sub(idx, regex, value):
+            changes[idx] = re.sub(regex, value, changes.get(idx, self.lines[idx]), count=1)
+        name = os.path.basename(self.path or "config.tcl")
+        for edit in edits:
+            if edit[0] == 'key':
+                key, value = edit[1], edit[2]
+                for idx in self.keys.get(key, []):
+                    changes[idx] = _sub_config_key(key, value, changes.get(idx, self.lines[idx]))
+                if log:
+                    logging.info("[FILE.INFO]: {0}; {1}".format(name, edit[3]))
+            elif edit[0] == 'associations':
+                subnets = edit[1]
+                if subnets is not None:
+                    #disable all associations both userBased and global associations, then enable the ones in the list
+                    for idx in self.association_lines:
+                        sub(idx, '{.*?}', "{false}")
+                    for subnet in subnets:
+                        if subnet not in self.subnets:
+                            logging.warning("[FILE.WARNING]: {0}; Association subnet not found: {1}".format(name, subnet))
+                        for idx in self.subnets.get(subnet, []):
+                            sub(idx, '{.*?}', "{true}")
                 else:
-                    logging.info("[FILE.INFO]: {0}; load config; SteadyState; Time: {1}".format(self.avalanche_config_filename, runtime))
-                    #open config file, make modifications, write to new file
-                    with open(temp_file, 'w') as new_file:
-                        with open(config_file) as old_file:
-                            #set the rampTime for the available load profiles matching under {Soak} or {Steady\s+State} - case insensitive
-                            for line in old_file:
-                                if re.search('loadprofile_handle\s+-steps.step\(\d+\).label\s+{Soak}', line, re.IGNORECASE) or re.search('loadprofile_handle\s+-steps.step\(\d+\).label\s+{Steady\s+State}', line, re.IGNORECASE) or re.search('loadprofile_handle\s+-steps.step\(\d+\).label\s+{SteadyState}', line, re.IGNORECASE):
-                                    #skip six lines and write them to the file to get to the steadyTime property
-                                    new_file.write(line)
-                                    line = old_file.next()
-                                    new_file.write(line)
-                                    line = old_file.next()
-                                    new_file.write(line)
-                                    line = old_file.next()
-                                    new_file.write(line)
-                                    line = old_file.next()
-                                    new_file.write(line)
-                                    line = old_file.next()
-                                    new_file.write(line)
-                                    line = old_file.next()
-                                    #use regex sub to set the rampTime - units: seconds
-                                    new_file.write(re.sub('{.*?}', "{%s}" % runtime, line))
-                                else:
-                                    new_file.write(line)
-
-                #close and move file                    
-                os.close(fh) 
-                shutil.move(temp_file, config_file) 
+                    #enable all associations both userBased and global associations
+                    for idx in self.association_lines:
+                        sub(idx, '{.*?}', "{true}")
+                if log:
+                    logging.info("[FILE.INFO]: {0}; Associations enabled: {1}".format(name, "all" if subnets is None else subnets))
+            elif edit[0] == 'runtime':
+                step_type, runtime, loads = edit[1], edit[2], edit[3]
+                for load in loads or []:
+                    if load not in self.loads:
+                        logging.warning("[FILE.WARNING]: {0}; Load profile not found: {1}".format(name, load))
+                runtime_lines = self.runtime_lines(step_type, loads)
+                for idx in runtime_lines:
+                    sub(idx, '{.*?}', "{%s}" % runtime)
+                if log:
+                    logging.info("[FILE.INFO]: {0}; load config; loads: {1}; {2}; Time: {3}; Steps changed: {4}".format(name, loads or "all", step_type, runtime, len(runtime_lines)))
+        #drop lines the edits left as they were
+        for idx in [idx for idx, line in changes.items() if line == self.lines[idx]]:
+            del changes[idx]
+        return changes
+
+    def runtime_lines(self, step_type, loads=None):
+        """
+        Line numbers of the rampTime/steadyTime property for every step of step_type [RampUp|RampDown|SteadyState] in the given loads (default: all loads)
+        """
+        runtime_lines = list()
+        for load in (loads if loads else self.loads.keys()):
+            for step in self.loads.get(load, {}).values():
+                if step['label'] is None or not re.match(RUNTIME_STEP_LABEL_REGEX[step_type], step['label'], re.IGNORECASE):
+                    continue
+                #fall back on the property position relative to the label when the property name is not in the file
+                idx = step['properties'].get(RUNTIME_STEP_PROPERTY[step_type], step['line'] + RUNTIME_STEP_OFFSET[step_type])
+                if idx < len(self.lines):
+                    runtime_lines.append(idx)
+        return runtime_lines
+
+    def update(self, changes):
+        """
+        Apply changed lines {line number: new line} after they have been written to the file - edits only change values so the index still holds
+        """
+        for idx, line in changes.items():
+            if self._offsets is not None and len(line) != len(self.lines[idx]):
+                #shift the offsets of the lines after a line that changed length
+                self._offsets[idx + 1:] += len(line) - len(self.lines[idx])
+            self.lines[idx] = line
+        self._digest = None
+
+    def stat(self):
+        """
+        Re-key the model on its file's current size/mtime - used after the edit session wrote the file
+        """
+        stat = os.stat(self.path)
+        self.size, self.mtime = stat.st_size, stat.st_mtime
+
+    def verify(self, data, digest):
+        """
+        True if data, the file contents hashing to digest, is what the model holds - a model edited since it was last verified is compared byte for byte once
+        """
+        if self._digest is None and self.serialize() == data:
+            self._digest = digest
+        return self._digest == digest
+
+    def digest(self):
+        """
+        sha1 of the config.tcl contents - computed lazily after edits
+        """
+        if self._digest is None:
+            self._digest = hashlib.sha1(self.serialize()).hexdigest()
+        return self._digest
+
+    def line_offset(self, idx):
+        """
+        Byte offset of line idx in the file
+        """
+        if self._offsets is None:
+            #kept up to date across updates rather than rebuilt
+            self._offsets = numpy.concatenate(([0], numpy.cumsum(numpy.fromiter((len(line) for line in self.lines), dtype=numpy.int64, count=len(self.lines)))))
+        return int(self._offsets[idx])
+
+    def serialize(self, changes=None):
+        """
+        The config.tcl contents, with changed lines {line number: new line} swapped in if given
+        """
+        if not changes:
+            return ''.join(self.lines)
+        lines = list(self.lines)
+        for idx, line in changes.items():
+            lines[idx] = line
+        return ''.join(lines)
+
+
+#cached ConfigModel per config.tcl file - {abs path: ConfigModel}
+_config_models = dict()
+
+
+def load_config_model(config_file, verify=True):
+    """
+    Get the ConfigModel of a config.tcl file
+
+    The model is cached per file and reused while the contents hash the same - the file is read and hashed since callers writing the
+    whole model out need it to match and size/mtime alone do not catch a different config copied over it (shutil.copy2 in get_config_files keeps the mtime).
+    With verify False a cached model whose size/mtime still match is returned without reading the file - only for callers that check
+    the bytes they write over themselves (see ConfigEditSession._patch)
+    """
+    path = os.path.abspath(config_file)
+    stat = os.stat(path)
+    model = _config_models.get(path)
+    if not verify and model and (model.size, model.mtime) == (stat.st_size, stat.st_mtime):
+        return model
+    with open(path, 'rb') as config:
+        data = config.read()
+    #a size change always means a reparse - only hash when it could still be the same file
+    if not model or model.size != len(data) or not model.verify(data, hashlib.sha1(data).hexdigest()):
+        model = ConfigModel(data)
+        logging.info("[FILE.INFO]: {0}; Parsed config: {1} lines, {2} loads, {3} associations".format(path, len(model.lines), len(model.loads), len(model.association_lines)))
+    model.path = path
+    model.size, model.mtime = stat.st_size, stat.st_mtime
+    _config_models[path] = model
+    return model
+
+
+
+#config.tcl key/value lines handled by the setters
+CONFIG_KEY_REGEX = {
+    'ReserveForce': 'ReserveForce\s+\d',
+    'Trial': 'Trial\s+\d',
+    'License': 'License\s+{',
+    'OutputDir': 'OutputDir\s+{',
+}
+ASSOCIATION_ENABLED_REGEX = '.client.(userBasedAssociations|globalAssociations).association\(\d+\).enabled'
+LOAD_PROFILE_REGEX = 'set\s+loadprofile_handle\s+\[getOrCreateNode\s+\$projectHandle\s+loads\s+([^\s\]]+)'
+STEP_PROPERTY_REGEX = 'loadprofile_handle\s+-steps.step\((\d+)\)\.(\w+)\s+{(.*?)}'
+#load profile step labels, the property holding their time and how many lines after the label it lives
+RUNTIME_STEP_LABEL_REGEX = {
+    'RampUp': 'Ramp\s*Up$',
+    'RampDown': 'Ramp\s*Down$',
+    'SteadyState': '(Soak|Steady\s*State)$',
+}
+RUNTIME_STEP_PROPERTY = {
+    'RampUp': 'rampTime',
+    'RampDown': 'rampTime',
+    'SteadyState': 'steadyTime',
+}
+RUNTIME_STEP_OFFSET = {
+    'RampUp': 5,
+    'RampDown': 5,
+    'SteadyState': 6,
+}
+
+
+def _runtime_step(param):
+    """
+    Map a set_runtime param [Soak|RampUp|RampDown] to its load profile step
+    """
+    if "up" in param.lower():
+        return 'RampUp'
+    elif "down" in param.lower():
+        return 'RampDown'
+    return 'SteadyState'
+
+
+def _sub_config_key(key, value, line):
+    """
+    Set the value of a config.tcl key line - digit bits for ReserveForce/Trial, {braced} values otherwise
+    """
+    if key in ('ReserveForce', 'Trial'):
+        return re.sub('(%s\s+)\d' % key, lambda match: match.group(1) + value, line, count=1)
+    return re.sub('(%s\s+){.*?}' % key, lambda match: match.group(1) + "{%s}" % value, line, count=1)
+
+
+#generate_config_variants cache key version - bump when the content generated for a variant changes
+VARIANT_CACHE_VERSION = 2
+#generate_config_variants matrix parameters - the set_runtime params and associations
+VARIANT_PARAMS = ['RampUp', 'Soak', 'SteadyState', 'RampDown', 'associations']
+#hostStats.csv per VLAN block record - vlan2 is None when there is no inner tag, metrics is a dict of metric name -> value (None if not found)
+VlanBlock = namedtuple('VlanBlock', ['vlan', 'vlan2', 'subnet_match', 'metrics'])
+#VLAN,<outer>[/<inner>] marker starting each hostStats.csv VLAN block
+VLAN_REGEX = re.compile('VLAN,(\d+)(?:/(\d+))?')
+#result of a managed tclsh run - status is one of the TCL_RUN_* values, errors the output lines matching TCL_ERROR_REGEX,
+#progress the last line matching TCL_PROGRESS_REGEX and output the last TCL_OUTPUT_TAIL lines
+TclRun = namedtuple('TclRun', ['returncode', 'status', 'elapsed', 'errors', 'progress', 'output'])
+TCL_RUN_OK = 'completed'
+TCL_RUN_FAILED = 'failed'
+TCL_RUN_TIMEOUT = 'timed out'
+TCL_RUN_INACTIVE = 'hung'
+TCL_RUN_CANCELLED = 'cancelled'
+#seconds a test may run in total - None for no limit, runtimes vary too much for a default
+TCL_TIMEOUT = None
+#seconds tclsh may go without output before it is considered hung - None for no limit, long soaks may stay quiet for a while
+TCL_INACTIVITY_TIMEOUT = None
+#seconds between timeout checks while tclsh is quiet
+TCL_POLL_INTERVAL = 1.0
+#seconds a terminated tclsh gets to exit before it is killed
+TCL_KILL_GRACE = 10
+#output lines kept in TclRun.output
+TCL_OUTPUT_TAIL = 200
+TCL_ERROR_REGEX = re.compile(r'\berror\b|\bexception\b|\bfailed\b|while executing', re.IGNORECASE)
+TCL_PROGRESS_REGEX = re.compile(r'\d+(\.\d+)?\s*%|\belapsed\b|\bprogress\b|\bstatus\b', re.IGNORECASE)
+#hostStats.csv per VLAN interval time series - samples is the number of data rows, durations in seconds, rates in bps and goodput in percent;
+#min_goodput/min_rate are the lowest rolling window values, steady_state is the time steady state was reached (None if never),
+#dips/dip_seconds/longest_dip count the rolling windows under threshold after it and series is the downsampled (times, rates, lowest goodput) arrays
+#(None when not kept) - a run without one full rolling window has insufficient samples and leaves min_goodput and the values after it None
+VlanSeries = namedtuple('VlanSeries', ['vlan', 'vlan2', 'subnet_match', 'samples', 'duration', 'min_goodput', 'min_rate', 'steady_state', 'steady_rate', 'dips', 'dip_seconds', 'longest_dip', 'series'])
+#cumulative counters the interval time series is built from
+SERIES_METRICS = ['Bytes Received', 'Goodput[Http] Cumulative Receive']
+#hostStats.csv sample time columns, first one found is used
+SAMPLE_TIME_COLUMNS = ['ElapsedTime', 'Elapsed Time', 'Time', 'Timestamp']
+#seconds between hostStats.csv samples when there is no time column
+SAMPLE_INTERVAL = 4.0
+#seconds of the time series rolling window
+SERIES_WINDOW = 30.0
+#points kept of each VLAN's downsampled time series
+SERIES_MAX_POINTS = 240
+#metrics published to Avalanche_Test_Results
+DEFAULT_METRICS = ['Bytes Received', 'Goodput[Http] Cumulative Receive', 'Goodput[Http] Ave Receive Rate (bps)']
+#fallback positions of the default metrics in the comma separated VLAN block for layouts where the header does not name them
+LEGACY_METRIC_OFFSETS = {
+    'Bytes Received': 712 * 2 + 9,
+    'Goodput[Http] Cumulative Receive': 712 * 2 + 249,
+    'Goodput[Http] Ave Receive Rate (bps)': 712 * 2 + 250,
+}
+#DatabasePool key marker of local SQLite results store connections
+LOCAL_STORE = 'sqlite'
+#local SQLite store Vlan_Slot_Pon_Mapping rows, as written by sync_vlan_mapping
+LOCAL_VLAN_MAPPING_INSERT = "INSERT INTO `Vlan_Slot_Pon_Mapping` (`TestBed`, `Vlan`, `vlan2`, `Slot`, `Pon`, `Port`) VALUES "
+#local SQLite store tables (see SQLiteDatabase)
+LOCAL_STORE_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS `Avalanche_Test_Results` (`id` INTEGER PRIMARY KEY AUTOINCREMENT, `testRun` TEXT, `testName` TEXT, `vlan` INTEGER, `vlan2` INTEGER, `slot` INTEGER, `pon` INTEGER, `port` INTEGER, "
+    "`bytesReceived` REAL, `goodPutCumRcv` REAL, `goodputAvgRcvRate` REAL, `timestamp` TEXT, `forwarded` INTEGER NOT NULL DEFAULT 0)",
+    "CREATE INDEX IF NOT EXISTS `Avalanche_Test_Results_testRun` ON `Avalanche_Test_Results` (`testRun`, `testName`)",
+    "CREATE INDEX IF NOT EXISTS `Avalanche_Test_Results_forwarded` ON `Avalanche_Test_Results` (`forwarded`)",
+    "CREATE TABLE IF NOT EXISTS `Avalanche_Test_Rollups` (`id` INTEGER PRIMARY KEY AUTOINCREMENT, `testRun` TEXT, `testName` TEXT, `level` TEXT, `slot` INTEGER, `pon` INTEGER, `port` INTEGER, "
+    "`vlans` INTEGER, `failed` INTEGER, `bytesReceived` REAL, `goodPutCumRcv` REAL, `minGoodput` REAL, `expectedGoodput` REAL, `timestamp` TEXT, `forwarded` INTEGER NOT NULL DEFAULT 0)",
+    "CREATE INDEX IF NOT EXISTS `Avalanche_Test_Rollups_testRun` ON `Avalanche_Test_Rollups` (`testRun`, `testName`, `level`)",
+    "CREATE TABLE IF NOT EXISTS `Avalanche_Goodput_Baseline` (`testName` TEXT NOT NULL, `testBed` TEXT NOT NULL, `vlan` INTEGER NOT NULL, `vlan2` INTEGER NOT NULL, "
+    "`runs` INTEGER, `mean` REAL, `m2` REAL, `minGoodput` REAL, `maxGoodput` REAL, `lastRun` TEXT, `timestamp` TEXT, PRIMARY KEY (`testName`, `testBed`, `vlan`, `vlan2`))",
+    "CREATE TABLE IF NOT EXISTS `Vlan_Slot_Pon_Mapping` (`TestBed` TEXT, `Vlan` INTEGER, `vlan2` INTEGER, `Slot` INTEGER, `Pon` INTEGER, `Port` INTEGER)",
+    "CREATE INDEX IF NOT EXISTS `Vlan_Slot_Pon_Mapping_TestBed` ON `Vlan_Slot_Pon_Mapping` (`TestBed`)",
+]
+#idle connections kept per host/port/database/user by DatabasePool
+DB_POOL_MAX_IDLE = 4
+#seconds a pooled connection may sit idle before it is health checked on checkout
+DB_POOL_PING_INTERVAL = 30
+#Avalanche_Test_Results column list, in the order publish_results writes its values
+AVALANCHE_TEST_RESULTS_FIELDS = "(`id`, `testRun`, `testName`, `vlan`, `vlan2`, `slot`, `pon`, `port`, `bytesReceived`, `goodPutCumRcv`, `goodputAvgRcvRate`, `timestamp`)"
+AVALANCHE_TEST_RESULTS_TABLE = "Avalanche_Test_Results"
+AVALANCHE_TEST_RESULTS_INSERT = "INSERT INTO `Avalanche_Test_Results` {0} VALUES ".format(AVALANCHE_TEST_RESULTS_FIELDS)
+#goodput rollup summary table published next to Avalanche_Test_Results (see publish_rollups)
+AVALANCHE_TEST_ROLLUPS_TABLE = "Avalanche_Test_Rollups"
+AVALANCHE_TEST_ROLLUPS_FIELDS = "(`id`, `testRun`, `testName`, `level`, `slot`, `pon`, `port`, `vlans`, `failed`, `bytesReceived`, `goodPutCumRcv`, `minGoodput`, `expectedGoodput`, `timestamp`)"
+AVALANCHE_TEST_ROLLUPS_INSERT = "INSERT INTO `Avalanche_Test_Rollups` {0} VALUES ".format(AVALANCHE_TEST_ROLLUPS_FIELDS)
+AVALANCHE_TEST_ROLLUPS_SCHEMA = ("CREATE TABLE IF NOT EXISTS `Avalanche_Test_Rollups` (`id` INT NOT NULL AUTO_INCREMENT, `testRun` VARCHAR(64), `testName` VARCHAR(255), `level` VARCHAR(8), "
+                                 "`slot` INT, `pon` INT, `port` INT, `vlans` INT, `failed` INT, `bytesReceived` DOUBLE, `goodPutCumRcv` DOUBLE, `minGoodput` DOUBLE, `expectedGoodput` DOUBLE, `timestamp` DATETIME, "
+                                 "PRIMARY KEY (`id`), KEY `testRun` (`testRun`, `testName`, `level`))")
+#running per VLAN goodput baseline of a test on a testbed (see Avalanche.compare_to_baseline)
+GOODPUT_BASELINE_TABLE = "Avalanche_Goodput_Baseline"
+GOODPUT_BASELINE_REPLACE = "REPLACE INTO `Avalanche_Goodput_Baseline` (`testName`, `testBed`, `vlan`, `vlan2`, `runs`, `mean`, `m2`, `minGoodput`, `maxGoodput`, `lastRun`, `timestamp`) VALUES "
+GOODPUT_BASELINE_SCHEMA = ("CREATE TABLE IF NOT EXISTS `Avalanche_Goodput_Baseline` (`testName` VARCHAR(255) NOT NULL, `testBed` VARCHAR(64) NOT NULL, `vlan` INT NOT NULL, `vlan2` INT NOT NULL, "
+                           "`runs` INT, `mean` DOUBLE, `m2` DOUBLE, `minGoodput` DOUBLE, `maxGoodput` DOUBLE, `lastRun` VARCHAR(64), `timestamp` DATETIME, PRIMARY KEY (`testName`, `testBed`, `vlan`, `vlan2`))")
+#goodput rollup levels - (level, key columns)
+ROLLUP_LEVELS = [('slot', ['slot']), ('pon', ['slot', 'pon']), ('port', ['slot', 'pon', 'port'])]
+#percent goodput of an Avalanche_Test_Results row, NULL when nothing was received - goodPutCumRcv/Bytes Received in bits
+GOODPUT_PERCENT_SQL = "ROUND(`goodPutCumRcv` * 100.0 / (`bytesReceived` * 8.0), 2)"
+#server side goodput evaluation (see analyze_goodput) - {0}: test run filter (see _results_filter), {1}: percent goodput threshold
+GOODPUT_SUMMARY_QUERY = "SELECT COUNT(*), COALESCE(SUM(CASE WHEN COALESCE(" + GOODPUT_PERCENT_SQL + ", -1) >= {1} THEN 1 ELSE 0 END), 0) FROM `Avalanche_Test_Results` WHERE {0}"
+GOODPUT_FAILING_QUERY = "SELECT `vlan`, `vlan2`, `slot`, `pon`, `port`, " + GOODPUT_PERCENT_SQL + " FROM `Avalanche_Test_Results` WHERE {0} AND COALESCE(" + GOODPUT_PERCENT_SQL + ", -1) < {1} ORDER BY `vlan`, `vlan2`"
+#goodput distribution percentiles reported by analyze_goodput (see goodput_statistics)
+GOODPUT_PERCENTILES = [5, 25, 50, 75, 95]
+#analyze_fairness group levels - (level, key columns)
+FAIRNESS_LEVELS = [('run', []), ('slot', ['slot']), ('pon', ['slot', 'pon'])]
+#rows per multi-row INSERT published by publish_results
+PUBLISH_BATCH_SIZE = 1000
+#publisher threads and queued row batches of a PublishPipeline
+PUBLISH_THREADS = 2
+PUBLISH_QUEUE_SIZE = 8
+#seconds a testbed VLAN mapping loaded by get_vlan_mapping is reused for
+VLAN_MAPPING_TTL = 3600
+#loaded VLAN mappings - {(results_store, db_ip, db_port, db_database, testbed): (load time, mapping)}
+_vlan_mappings = dict()
+#bump when parsing changes so existing results caches get invalidated
+RESULTS_CACHE_VERSION = 1
+#resolved hostStats.csv column schemas - {header line: {column name: index}}
+_host_stats_schemas = dict()
+
+
+def host_stats_schema(header):
+    """
+    Get the column name -> index schema of a hostStats.csv header line
+
+    Schemas are cached on the header itself, so each Avalanche version's layout is only resolved once
+    """
+    schema = _host_stats_schemas.get(header)
+    if schema is None:
+        schema = dict()
+        for idx, name in enumerate(header.rstrip('\r\n').split(',')):
+            schema.setdefault(name.strip().strip('"'), idx)
+        #headers are per Avalanche version so this stays small - keep it that way if a file carries odd headers
+        if len(_host_stats_schemas) >= 64:
+            _host_stats_schemas.clear()
+        _host_stats_schemas[header] = schema
+        logging.info("[AVALANCHE.RESULTS]: hostStats.csv schema resolved; {0} columns".format(len(schema)))
+    return schema
+
+
+def iter_vlan_blocks(client_results, my_subnet="10.213.", metrics=None, use_mmap=False):
+    """
+    Walk a client side hostStats.csv file once and yield a VlanBlock per block of VLAN data
+
+    args = {
+                client_results: the hostStats.csv file
+                my_subnet: the users subnet (10.213.*) - sets subnet_match on the blocks containing it
+                metrics: list of hostStats.csv column names to extract (default: DEFAULT_METRICS)
+                use_mmap: if 'True', scan the file through mmap and only copy out the header and data rows of each block, else read it line by line (default)
+            }
+
+    A block runs from its VLAN,<outer>[/<inner>] marker up to the next marker (or the end of the file), the marker itself excluded.
+    Metrics are looked up by name in the block's header row and taken from the last data row.
+    Only the current block is held in memory so the cost is linear in the file size - with use_mmap not even that, the OS pages the file in and out
+    so peak memory stays flat on multi-gigabyte soak test results.
+    """
+    metrics = list(metrics or DEFAULT_METRICS)
+    if use_mmap:
+        for vlan_block in _iter_vlan_blocks_mmap(client_results, my_subnet, metrics):
+            yield vlan_block
+        return
+    stream = _VlanBlockStream(my_subnet, metrics)
+    with open(client_results, 'rb') as client_results_file:
+        for line in client_results_file:
+            vlan_block = stream.feed(line)
+            if vlan_block:
+                yield vlan_block
+    vlan_block = stream.close()
+    if vlan_block:
+        yield vlan_block
+
+
+class _VlanBlockStream():
+    """
+    Splits hostStats.csv lines into VLAN blocks as they are fed in - feed() hands back each block once the next VLAN marker closes it
+    """
+
+    def __init__(self, my_subnet, metrics, block_parser=None):
+        self.my_subnet = my_subnet
+        self.metrics = metrics
+        #(vlan, vlan2, my_subnet, metrics) -> block parser with add(line)/record()
+        self.block_parser = block_parser or _VlanBlockParser
+        self.block = None
+
+    def feed(self, line):
+        match = VLAN_REGEX.search(line) if 'VLAN,' in line else None
+        if not match:
+            if self.block:
+                self.block.add(line)
+            return None
+        #a new VLAN marker closes off the previous block
+        vlan_block = None
+        if self.block:
+            self.block.add(line[:match.start()])
+            vlan_block = self.block.record()
+        self.block = self.block_parser(match.group(1), match.group(2), self.my_subnet, self.metrics)
+        self.block.add(line[match.end():])
+        return vlan_block
+
+    def current(self):
+        """
+        Record of the still open block as of the lines fed so far, if any
+        """
+        if self.block:
+            return self.block.record()
+        return None
+
+    def close(self):
+        vlan_block = self.current()
+        self.block = None
+        return vlan_block
+
+
+def _iter_vlan_blocks_mmap(client_results, my_subnet, metrics):
+    """
+    iter_vlan_blocks over a memory map of the file - blocks are located by their markers and only their header and last data row are sliced out
+    """
+    with open(client_results, 'rb') as client_results_file:
+        if os.fstat(client_results_file.fileno()).st_size == 0:
+            return
+        results_map = mmap.mmap(client_results_file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            markers = VLAN_REGEX.finditer(results_map)
+            match = next(markers, None)
+            while match:
+                next_match = next(markers, None)
+                end = next_match.start() if next_match else len(results_map)
+                yield _vlan_block_from_map(results_map, match.group(1), match.group(2), match.end(), end, my_subnet, metrics)
+                match = next_match
+        finally:
+            results_map.close()
+
+
+def _vlan_block_from_map(results_map, vlan, vlan2, start, end, my_subnet, metrics):
+    """
+    Build the VlanBlock record of the block at results_map[start:end] without copying the block
+    """
+    subnet_match = results_map.find(my_subnet, start, end) != -1
+    schema = row = None
+    #the header row is the first line naming one of the metrics
+    positions = [pos for pos in (results_map.find(name, start, end) for name in metrics) if pos != -1]
+    if positions:
+        header_start = max(start, results_map.rfind('\n', start, min(positions)) + 1)
+        header_end = results_map.find('\n', min(positions), end)
+        header_end = end if header_end == -1 else header_end + 1
+        header = results_map[header_start:header_end]
+        schema = host_stats_schema(header)
+        columns = header.count(',')
+        #walk back from the end of the block to the last data row lined up with the header
+        line_end = end
+        while line_end > header_end:
+            newline = results_map.rfind('\n', header_end, line_end - 1)
+            line_start = header_end if newline == -1 else newline + 1
+            line = results_map[line_start:line_end]
+            if line.count(',') == columns:
+                row = line
+                break
+            line_end = line_start
+    return VlanBlock(vlan, vlan2, subnet_match, _vlan_block_metrics(metrics, schema, row, lambda: results_map[start:end]))
+
+
+class _VlanBlockParser():
+    """
+    Builds the VlanBlock record of one hostStats.csv VLAN block, line by line
+    """
+
+    def __init__(self, vlan, vlan2, my_subnet, metrics):
+        self.vlan = vlan
+        self.vlan2 = vlan2
+        self.my_subnet = my_subnet
+        self.metrics = metrics
+        self.subnet_match = False
+        self.schema = None
+        self.columns = None
+        self.row = None
+        #block lines are only kept while a legacy positional lookup may still be needed
+        self.lines = list()
+
+    def add(self, line):
+        if self.lines is not None:
+            self.lines.append(line)
+        if not self.subnet_match and self.my_subnet in line:
+            self.subnet_match = True
+        if self.schema is None:
+            if any(name in line for name in self.metrics):
+                self.schema = host_stats_schema(line)
+                self.columns = line.count(',')
+                if all(name in self.schema for name in self.metrics):
+                    self.lines = None
+        elif line.count(',') == self.columns:
+            #data rows line up with the header - the last one carries the final values
+            self.row = line
+            self.data_row(line)
+
+    def data_row(self, line):
+        pass
+
+    def record(self):
+        legacy_block = (lambda: ''.join(self.lines)) if self.lines is not None else None
+        return VlanBlock(self.vlan, self.vlan2, self.subnet_match, _vlan_block_metrics(self.metrics, self.schema, self.row, legacy_block))
+
+
+class _VlanSeriesParser(_VlanBlockParser):
+    """
+    Collects the interval samples (time, Bytes Received, Goodput[Http] Cumulative Receive) of one hostStats.csv VLAN block and
+    turns them into a VlanSeries (see vlan_series) - only the current block's samples are held
+    """
+
+    def __init__(self, vlan, vlan2, my_subnet, metrics, options, subnet_only=False):
+        _VlanBlockParser.__init__(self, vlan, vlan2, my_subnet, SERIES_METRICS)
+        #the series needs the metrics named in the header, there is no legacy fallback
+        self.lines = None
+        self.options = options
+        self.subnet_only = subnet_only
+        self.samples = [array.array('d'), array.array('d'), array.array('d')]
+        self.fields = None
+
+    def data_row(self, line):
+        if self.fields is None:
+            time_column = next((self.schema[name] for name in SAMPLE_TIME_COLUMNS if name in self.schema), None)
+            self.fields = [time_column] + [self.schema.get(name) for name in SERIES_METRICS]
+        fields = line.rstrip('\r\n').split(',')
+        values = [_to_number(fields[idx]) if idx is not None and idx < len(fields) else None for idx in self.fields]
+        if values[1] is None or values[2] is None:
+            return
+        #no time column - samples are a stats interval apart
+        self.samples[0].append(values[0] if values[0] is not None else len(self.samples[0]) * self.options['interval'])
+        self.samples[1].append(values[1])
+        self.samples[2].append(values[2])
+
+    def record(self):
+        if self.subnet_only and not self.subnet_match:
+            return None
+        times, bytes_received, goodput = [numpy.frombuffer(samples, dtype=numpy.float64) if len(samples) else numpy.zeros(0) for samples in self.samples]
+        return vlan_series(self.vlan, self.vlan2, self.subnet_match, times, bytes_received, goodput, **self.options)
+
+
+def _vlan_block_metrics(metrics, schema, row, legacy_block=None):
+    """
+    Pull metrics out of a VLAN block's data row through its header schema
+
+    Metrics the header does not name fall back on their LEGACY_METRIC_OFFSETS position in the block text returned by legacy_block(), when given
+    """
+    values = dict()
+    fields = row.rstrip('\r\n').split(',') if row else []
+    legacy_fields = None
+    for name in metrics:
+        idx = schema.get(name) if schema else None
+        if idx is not None and idx < len(fields):
+            values[name] = _to_number(fields[idx])
+        elif name in LEGACY_METRIC_OFFSETS and legacy_block:
+            if legacy_fields is None:
+                legacy_fields = legacy_block().split(',')
+            idx = LEGACY_METRIC_OFFSETS[name]
+            values[name] = _to_number(legacy_fields[idx]) if idx < len(legacy_fields) else None
+        else:
+            values[name] = None
+    return values
+
+
+def iter_vlan_series(client_results, my_subnet="10.213.", window=None, min_goodput=85.0, dip_fraction=0.5, steady_tolerance=0.1, max_points=None, interval=None, subnet_only=False, keep_series=True):
+    """
+    Walk a client side hostStats.csv file once and yield a VlanSeries of the interval samples of each VLAN block (see vlan_series)
+
+    args = {
+                client_results: the hostStats.csv file
+                my_subnet: the users subnet (10.213.*) - sets subnet_match on the VLANs containing it
+                window: seconds of the rolling window (default: SERIES_WINDOW)
+                min_goodput: percent goodput a rolling window dips below (e.g. 85.0)
+                dip_fraction: fraction of the steady state goodput rate a rolling window dips below (e.g. 0.5)
+                steady_tolerance: fraction below the steady state goodput rate the rolling window has to be within to count as steady (e.g. 0.1)
+                max_points: points kept of each VLAN's downsampled series (default: SERIES_MAX_POINTS)
+                interval: seconds between samples when the file has no time column (default: SAMPLE_INTERVAL)
+                subnet_only: if 'True', skip the VLANs not containing my_subnet without analyzing them
+                keep_series: if 'False', only the summary values are kept - series is None
+            }
+
+    Every data row of a block is an interval sample. Only the current block's samples are held while it is read and each VLAN keeps
+    no more than max_points, so memory stays bounded however long the run
+    """
+    options = {
+        'window': window or SERIES_WINDOW,
+        'min_goodput': min_goodput,
+        'dip_fraction': dip_fraction,
+        'steady_tolerance': steady_tolerance,
+        'max_points': max_points or SERIES_MAX_POINTS,
+        'interval': interval or SAMPLE_INTERVAL,
+        'keep_series': keep_series,
+    }
+    stream = _VlanBlockStream(my_subnet, SERIES_METRICS, lambda vlan, vlan2, my_subnet, metrics: _VlanSeriesParser(vlan, vlan2, my_subnet, metrics, options, subnet_only))
+    with open(client_results, 'rb') as client_results_file:
+        for line in client_results_file:
+            vlan_series = stream.feed(line)
+            if vlan_series:
+                yield vlan_series
+    vlan_series = stream.close()
+    if vlan_series:
+        yield vlan_series
+
+
+def vlan_series(vlan, vlan2, subnet_match, times, bytes_received, goodput, window=30.0, min_goodput=85.0, dip_fraction=0.5, steady_tolerance=0.1, max_points=240, interval=4.0, keep_series=True):
+    """
+    Windowed goodput analysis of one VLAN's interval samples - times (seconds) and the cumulative Bytes Received / Goodput[Http] Cumulative Receive counters
+
+    Every sample gets the goodput rate and percent goodput of the rolling window ending at it. The steady state rate is the median window rate over the
+    second half of the run and steady state is reached at the first window within steady_tolerance of it. From then on a window is a dip when its percent
+    goodput is under min_goodput (nothing received counts as 0%) or its rate under dip_fraction of the steady state rate.
+    The series is downsampled to max_points buckets of (bucket end time, average goodput rate, lowest window percent goodput) so dips survive it.
+    A run shorter than the window has insufficient samples - its values are left None
+    """
+    samples = len(times)
+    duration = float(times[-1] - times[0]) if samples else 0.0
+    if samples < 2 or duration < window * 0.999:
+        return VlanSeries(vlan, vlan2, subnet_match, samples, duration, None, None, None, None, 0, 0.0, 0.0,
+                          (numpy.zeros(0), numpy.zeros(0), numpy.zeros(0)) if keep_series else None)
+    #counters restarting mid run would show up as negative intervals, carry on from where they were
+    bytes_received = numpy.concatenate(([bytes_received[0]], bytes_received[0] + numpy.cumsum(numpy.maximum(numpy.diff(bytes_received), 0))))
+    goodput = numpy.concatenate(([goodput[0]], goodput[0] + numpy.cumsum(numpy.maximum(numpy.diff(goodput), 0))))
+
+    #rolling window ending at each sample - from the last sample at least window seconds earlier
+    start = numpy.maximum(numpy.searchsorted(times, times - window, side='right') - 1, 0)
+    full = times - times[start] >= window * 0.999
+    span = times - times[start]
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        window_rate = (goodput - goodput[start]) / span
+        window_bytes = bytes_received - bytes_received[start]
+        window_goodput = numpy.where(window_bytes > 0, (goodput - goodput[start]) / (window_bytes * 8.0) * 100, 0.0)
+    window_rate, window_goodput = window_rate[full], numpy.round(window_goodput[full], 2)
+    window_times = times[full]
+
+    steady_rate = float(numpy.median(window_rate[len(window_rate) // 2:]))
+    steady = numpy.flatnonzero(window_rate >= steady_rate * (1 - steady_tolerance))
+    steady_from = steady[0] if len(steady) else len(window_rate)
+    steady_state = float(window_times[steady_from] - times[0]) if len(steady) else None
+
+    #dips once steady state is reached, timed by the sample intervals they cover
+    dipped = (window_goodput < min_goodput) | (window_rate < steady_rate * dip_fraction)
+    dipped[:steady_from] = False
+    intervals = numpy.diff(numpy.concatenate(([times[0]], window_times)))
+    edges = numpy.diff(numpy.concatenate(([0], dipped.astype(numpy.int8), [0])))
+    dip_starts, dip_ends = numpy.flatnonzero(edges == 1), numpy.flatnonzero(edges == -1)
+    dip_lengths = numpy.array([intervals[dip_start:dip_end].sum() for dip_start, dip_end in zip(dip_starts, dip_ends)])
+
+    if not keep_series:
+        return VlanSeries(vlan, vlan2, subnet_match, samples, duration, float(window_goodput.min()), float(window_rate.min()),
+                          steady_state, steady_rate, len(dip_starts), float(dip_lengths.sum()) if len(dip_lengths) else 0.0,
+                          float(dip_lengths.max()) if len(dip_lengths) else 0.0, None)
+
+    #downsample into at most max_points time buckets
+    bounds = numpy.linspace(times[0], times[-1], min(max_points, samples - 1) + 1)
+    ends = numpy.searchsorted(times, bounds, side='right') - 1
+    ends = numpy.unique(ends)
+    series_times = times[ends[1:]]
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        series_rate = numpy.diff(goodput[ends]) / numpy.diff(times[ends])
+    window_ends = numpy.searchsorted(window_times, series_times, side='right')
+    window_starts = numpy.concatenate(([0], window_ends[:-1]))
+    series_goodput = numpy.array([window_goodput[first:last].min() if last > first else numpy.nan for first, last in zip(window_starts, window_ends)])
+
+    return VlanSeries(vlan, vlan2, subnet_match, samples, duration, float(window_goodput.min()), float(window_rate.min()),
+                      steady_state, steady_rate, len(dip_starts), float(dip_lengths.sum()) if len(dip_lengths) else 0.0,
+                      float(dip_lengths.max()) if len(dip_lengths) else 0.0, (series_times, series_rate, series_goodput))
+
+
+class VlanBlockIndex():
+    """
+    Byte offset index of the VLAN blocks of a client side hostStats.csv file
+
+    args = {
+                client_results: the hostStats.csv file
+            }
+
+    Maps (vlan, vlan2) -> (offset, length) of each VLAN's block (vlan2 0 when there is no inner tag) so a single VLAN can be
+    read and parsed without scanning the file. The index is built with one marker scan over a memory map of the file and saved
+    next to it (hostStats.csv.index.npz) - it is rebuilt only when the file's path/size/mtime change.
+    Use get_vlan_block_index() to share indexes between lookups.
+    """
+
+    def __init__(self, client_results):
+        """
+        Class initialization
+        """
+        self.client_results = client_results
+        self.index_file = client_results + ".index.npz"
+        self.identity = _file_identity(client_results)
+        self.offsets = self._load()
+        if self.offsets is None:
+            self.offsets = self._build()
+            self._save()
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __contains__(self, key):
+        return key in self.offsets
+
+    def keys(self):
+        return self.offsets.keys()
+
+    def lookup(self, vlan, vlan2=0, my_subnet="10.213.", metrics=None):
+        """
+        Seek straight to a VLAN's block and parse only that block - returns its VlanBlock, None if the VLAN is not in the file
+        """
+        key = (int(vlan), int(vlan2 or 0))
+        if key not in self.offsets:
+            return None
+        offset, length = self.offsets[key]
+        with open(self.client_results, 'rb') as client_results_file:
+            results_map = mmap.mmap(client_results_file.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                return _vlan_block_from_map(results_map, str(key[0]), str(key[1]) if key[1] else None, offset, offset + length, my_subnet, list(metrics or DEFAULT_METRICS))
+            finally:
+                results_map.close()
+
+    def _build(self):
+        offsets = dict()
+        with open(self.client_results, 'rb') as client_results_file:
+            if os.fstat(client_results_file.fileno()).st_size == 0:
+                return offsets
+            results_map = mmap.mmap(client_results_file.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                markers = VLAN_REGEX.finditer(results_map)
+                match = next(markers, None)
+                while match:
+                    next_match = next(markers, None)
+                    end = next_match.start() if next_match else len(results_map)
+                    #first block wins should a VLAN show up twice
+                    offsets.setdefault((int(match.group(1)), int(match.group(2) or 0)), (match.end(), end - match.end()))
+                    match = next_match
+            finally:
+                results_map.close()
+        logging.info("[AVALANCHE.RESULTS]: {0}; VLAN index built; {1} VLANs".format(self.client_results, len(offsets)))
+        return offsets
+
+    def _load(self):
+        if not os.path.isfile(self.index_file):
+            return None
+        try:
+            with numpy.load(self.index_file) as cached:
+                if str(cached['key']) != self.identity:
+                    return None
+                rows = cached['offsets'].tolist()
+        except Exception, e:
+            logging.warning("[AVALANCHE.RESULTS]: {0}; unreadable VLAN index; {1}".format(self.index_file, e))
+            return None
+        return dict(((vlan, vlan2), (offset, length)) for vlan, vlan2, offset, length in rows)
+
+    def _save(self):
+        rows = numpy.array([key + value for key, value in self.offsets.items()], dtype=numpy.int64).reshape(-1, 4)
+        try:
+            fh, temp_file = mkstemp(dir=os.path.dirname(self.index_file) or None)
+            with os.fdopen(fh, 'wb') as new_file:
+                numpy.savez(new_file, key=numpy.array(self.identity), offsets=rows)
+            _atomic_replace(temp_file, self.index_file)
+        except EnvironmentError, e:
+            logging.warning("[AVALANCHE.RESULTS]: {0}; VLAN index not written; {1}".format(self.index_file, e))
+
+
+#VlanBlockIndex per hostStats.csv file - {abs path: VlanBlockIndex}
+_vlan_block_indexes = dict()
+
+
+def get_vlan_block_index(client_results):
+    """
+    Get the VlanBlockIndex of a hostStats.csv file, reused for as long as the file is unchanged
+    """
+    path = os.path.abspath(client_results)
+    index = _vlan_block_indexes.get(path)
+    if index is None or index.identity != _file_identity(path):
+        index = VlanBlockIndex(path)
+        _vlan_block_indexes[path] = index
+    return index
+
+
+class TclProcess():
+    """
+    Runs tclsh as a managed subprocess
+
+    args = {
+                command: the command line (e.g. ['tclsh', 'test.tcl'])
+                cwd: directory to run it in
+                timeout: seconds it may run in total, None for no limit
+                inactivity_timeout: seconds it may go without output, None for no limit
+                callback: optional callback(line) handed each output line
+            }
+
+    stdout and stderr are merged and read by a background thread onto a queue, so the output is logged and scanned for
+    errors (TCL_ERROR_REGEX) and progress (TCL_PROGRESS_REGEX) as it arrives without ever blocking on the pipe. A process
+    past either timeout, cancelled from another thread, or left behind by an exception (e.g. Ctrl-C) in run() is killed along with its children.
+    run() returns a TclRun
+    """
+
+    def __init__(self, command, cwd=None, timeout=None, inactivity_timeout=None, callback=None):
+        """
+        Class initialization
+        """
+        self.command = command
+        self.cwd = cwd
+        self.timeout = timeout
+        self.inactivity_timeout = inactivity_timeout
+        self.callback = callback
+        self.process = None
+        self._cancel = threading.Event()
+
+    def run(self):
+        """
+        Start the process and wait for it to exit, time out or be cancelled
+        """
+        options = dict()
+        if os.name == 'posix':
+            #own process group so the children go down with it
+            options['preexec_fn'] = os.setsid
+        try:
+            self.process = subprocess.Popen(self.command, cwd=self.cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, bufsize=1, **options)
+        except EnvironmentError, e:
+            logging.warning("[AVALANCHE.ERROR]: Could not start {0}; {1}".format(' '.join(self.command), e))
+            return TclRun(None, TCL_RUN_FAILED, 0.0, [str(e)], None, [])
+        logging.info("[AVALANCHE]: Started {0}; pid: {1}".format(' '.join(self.command), self.process.pid))
+
+        lines = Queue.Queue()
+        reader = threading.Thread(target=self._read, args=(self.process.stdout, lines), name="TclOutputReader")
+        reader.daemon = True
+        reader.start()
+
+        started = last_output = time.time()
+        errors, progress, output = list(), None, deque(maxlen=TCL_OUTPUT_TAIL)
+        status = None
+        try:
+            eof = False
+            while not eof:
+                try:
+                    line = lines.get(timeout=TCL_POLL_INTERVAL)
+                except Queue.Empty:
+                    line = ''
+                if line is None:
+                    eof = True
+                elif line:
+                    last_output = time.time()
+                    line = line.rstrip('\r\n')
+                    output.append(line)
+                    logging.debug("[AVALANCHE.TCL]: {0}".format(line))
+                    if TCL_ERROR_REGEX.search(line):
+                        errors.append(line)
+                        logging.warning("[AVALANCHE.TCL]: {0}".format(line))
+                    if TCL_PROGRESS_REGEX.search(line):
+                        progress = line
+                    if self.callback:
+                        try:
+                            self.callback(line)
+                        except Exception, e:
+                            logging.warning("[AVALANCHE.TCL]: callback failed; {0}".format(e))
+                now = time.time()
+                if self._cancel.is_set():
+                    status = TCL_RUN_CANCELLED
+                elif self.timeout is not None and now - started > self.timeout:
+                    status = TCL_RUN_TIMEOUT
+                elif self.inactivity_timeout is not None and now - last_output > self.inactivity_timeout:
+                    status = TCL_RUN_INACTIVE
+                if status:
+                    logging.warning("[AVALANCHE.ERROR]: {0} {1} after {2}s; killing pid {3}".format(' '.join(self.command), status, round(now - started, 1), self.process.pid))
+                    self._kill()
+                    break
+
+            returncode = self.process.wait()
+        except BaseException:
+            #KeyboardInterrupt/SystemExit or a failure in here - tclsh runs in its own process group and would outlive us
+            logging.warning("[AVALANCHE.ERROR]: {0} interrupted; killing pid {1}".format(' '.join(self.command), self.process.pid))
+            self._kill()
+            reader.join(TCL_KILL_GRACE)
+            raise
+        reader.join(TCL_KILL_GRACE)
+        if status is None:
+            status = TCL_RUN_OK if returncode == 0 else TCL_RUN_FAILED
+        return TclRun(returncode, status, round(time.time() - started, 1), errors, progress, list(output))
+
+    def cancel(self):
+        """
+        Kill the process from another thread - run() returns with a cancelled status
+        """
+        self._cancel.set()
+
+    def _read(self, stream, lines):
+        """
+        Reader thread - queue each output line, None at end of output
+        """
+        try:
+            for line in iter(stream.readline, ''):
+                lines.put(line)
+        finally:
+            stream.close()
+            lines.put(None)
+
+    def _kill(self):
+        """
+        Terminate the process and its children, killing it outright if it is still up after TCL_KILL_GRACE seconds
+        """
+        try:
+            if os.name == 'nt':
+                #tclsh has Avalanche children of its own - take down the whole tree
+                subprocess.call(['taskkill', '/F', '/T', '/PID', str(self.process.pid)], stdout=open(os.devnull, 'w'), stderr=subprocess.STDOUT)
+            else:
+                os.killpg(self.process.pid, signal.SIGTERM)
+        except EnvironmentError, e:
+            logging.warning("[AVALANCHE.ERROR]: Could not terminate pid {0}; {1}".format(self.process.pid, e))
+        deadline = time.time() + TCL_KILL_GRACE
+        while self.process.poll() is None and time.time() < deadline:
+            time.sleep(0.1)
+        if self.process.poll() is None:
+            try:
+                if os.name == 'nt':
+                    self.process.kill()
+                else:
+                    os.killpg(self.process.pid, signal.SIGKILL)
+            except EnvironmentError, e:
+                logging.warning("[AVALANCHE.ERROR]: Could not kill pid {0}; {1}".format(self.process.pid, e))
+
+
+class LiveResultsMonitor():
+    """
+    Follows the growing client side hostStats.csv files of a running Avalanche test
+
+    args = {
+                results_dir: the Avalanche results directory holding the client-* directories (e.g. C:/AvalancheExeDir/results)
+                my_subnet: the users subnet (10.213.*) - only VLAN blocks containing it are reported
+                metrics: list of hostStats.csv column names to follow (default: DEFAULT_METRICS)
+                interval: seconds between polls
+            }
+
+    Each poll only reads the bytes appended to each file since the last poll, picks up client directories as they appear and
+    starts over on a file that got truncated. The snapshot is a dict of (vlan, vlan2) -> (percent goodput, metrics) where the
+    VLAN block still being written reports its latest data row.
+
+        monitor = instance.monitor_results()
+        monitor.start(callback)     #or iterate it from your own thread: for snapshot in monitor: ...
+        instance.start()
+        monitor.stop()
+    """
+
+    def __init__(self, results_dir, my_subnet="10.213.", metrics=None, interval=10.0):
+        """
+        Class initialization
+        """
+        self.results_dir = results_dir
+        self.my_subnet = my_subnet
+        self.metrics = list(metrics or DEFAULT_METRICS)
+        self.interval = interval
+        self.tails = dict()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def poll(self):
+        """
+        Read whatever was appended since the last poll and return the live snapshot
+        """
+        try:
+            directories = sorted(directory for directory in os.listdir(self.results_dir) if 'client' in directory)
+        except EnvironmentError:
+            #results directory not created yet
+            directories = list()
+        for directory in directories:
+            client_results = os.path.join(self.results_dir, directory, "hostStats.csv")
+            if directory not in self.tails and os.path.isfile(client_results):
+                self.tails[directory] = _HostStatsTail(client_results, self.my_subnet, self.metrics)
+        snapshot = dict()
+        for directory in sorted(self.tails.keys()):
+            snapshot.update(self.tails[directory].poll())
+        return snapshot
+
+    def __iter__(self):
+        """
+        Yield a snapshot every interval until stop() is called
+        """
+        while not self._stop.is_set():
+            yield self.poll()
+            self._stop.wait(self.interval)
+
+    def start(self, callback):
+        """
+        Poll in a background thread, handing each snapshot to callback(snapshot)
+        """
+        def follow():
+            for snapshot in self:
+                try:
+                    callback(snapshot)
+                except Exception, e:
+                    logging.warning("[AVALANCHE.LIVE]: callback failed; {0}".format(e))
+        self._stop.clear()
+        self._thread = threading.Thread(target=follow, name="LiveResultsMonitor")
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop iterating/polling and wait for the background thread, if any
+        """
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+
+class _HostStatsTail():
+    """
+    Incremental reader of one growing hostStats.csv file - keeps its read offset, the trailing partial line and the open VLAN block between polls
+    """
+
+    def __init__(self, client_results, my_subnet, metrics):
+        self.client_results = client_results
+        self.my_subnet = my_subnet
+        self.metrics = metrics
+        self.offset = 0
+        self.partial = ''
+        self.stream = _VlanBlockStream(my_subnet, metrics)
+        self.snapshot = dict()
+
+    def poll(self):
+        try:
+            size = os.path.getsize(self.client_results)
+        except EnvironmentError:
+            return self.snapshot
+        if size < self.offset:
+            #file was rewritten - start over
+            logging.info("[AVALANCHE.LIVE]: {0}; file truncated, rereading".format(self.client_results))
+            self.offset = 0
+            self.partial = ''
+            self.stream = _VlanBlockStream(self.my_subnet, self.metrics)
+            self.snapshot = dict()
+        if size > self.offset:
+            with open(self.client_results, 'rb') as client_results_file:
+                client_results_file.seek(self.offset)
+                data = client_results_file.read(size - self.offset)
+            self.offset += len(data)
+            #only complete lines are parsed, the tail end waits for the next poll
+            data = self.partial + data
+            cut = data.rfind('\n') + 1
+            self.partial = data[cut:]
+            for line in data[:cut].splitlines(True):
+                self._update(self.stream.feed(line))
+            self._update(self.stream.current())
+        return self.snapshot
+
+    def _update(self, vlan_block):
+        if vlan_block and vlan_block.subnet_match:
+            self.snapshot[(int(vlan_block.vlan), int(vlan_block.vlan2 or 0))] = (_goodput_percent(vlan_block.metrics), vlan_block.metrics)
+
+
+def goodput_percent(results):
+    """
+    Percent goodput per VLAN of a VlanStatsTable - goodPutCumRcv/Bytes Received in bits, rounded to 2 places, NaN when nothing was received
+    """
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        goodput = numpy.round(results['Goodput[Http] Cumulative Receive'] / (results['Bytes Received'] * 8.0) * 100, 2)
+    goodput[~numpy.isfinite(goodput)] = numpy.nan
+    return goodput
+
+
+def goodput_statistics(results, goodput, min_goodput, worst=10):
+    """
+    Goodput distribution of a VlanStatsTable from its goodput_percent
+
+    Returns a dict of 'vlans', 'passed', 'failed' and 'no_goodput' counts, 'min', 'mean', 'max' and 'percentiles' ({percentile: goodput}, see GOODPUT_PERCENTILES)
+    over the VLANs with a goodput (None if there are none) and 'worst' - (vlan, vlan2, goodput) of the worst VLANs, lowest first with no goodput ranked lowest
+    """
+    measured = goodput[~numpy.isnan(goodput)]
+    with numpy.errstate(invalid='ignore'):
+        passed = int(numpy.count_nonzero(goodput >= min_goodput))
+    stats = {
+        'vlans': len(goodput),
+        'passed': passed,
+        'failed': len(goodput) - passed,
+        'no_goodput': len(goodput) - len(measured),
+        'min': None,
+        'mean': None,
+        'max': None,
+        'percentiles': dict((percentile, None) for percentile in GOODPUT_PERCENTILES),
+    }
+    if len(measured):
+        stats['min'] = float(measured.min())
+        stats['mean'] = round(float(measured.mean()), 2)
+        stats['max'] = float(measured.max())
+        stats['percentiles'] = dict(zip(GOODPUT_PERCENTILES, numpy.round(numpy.percentile(measured, GOODPUT_PERCENTILES), 2).tolist()))
+    #stable sort keeps table order between equal goodputs
+    order = numpy.argsort(numpy.where(numpy.isnan(goodput), -numpy.inf, goodput), kind='mergesort')[:worst]
+    stats['worst'] = zip(results['vlan'][order].tolist(), results['vlan2'][order].tolist(), goodput[order].tolist())
+    return stats
+
+
+def _group_index(results, columns, rows=None):
+    """
+    Group the rows of a VlanStatsTable by key columns for bincount/reduceat - rows optionally masks the rows taking part
+
+    Returns the sorted list of group key tuples and the group number of each row, no columns puts every row in one () group
+    """
+    columns = list(columns)
+    length = len(results) if rows is None else int(numpy.count_nonzero(rows))
+    if not columns:
+        return [()], numpy.zeros(length, dtype=numpy.intp)
+    if not length:
+        return [], numpy.zeros(0, dtype=numpy.intp)
+    keys = numpy.stack([results[name] if rows is None else results[name][rows] for name in columns], axis=1)
+    keys, inverse = numpy.unique(keys, axis=0, return_inverse=True)
+    return [tuple(key) for key in keys.tolist()], inverse
+
+
+def _group_reduce(ufunc, values, inverse, count):
+    """
+    Reduce values per group with a ufunc (e.g. numpy.minimum) - count is the bincount of inverse
+    """
+    ordered = values[numpy.argsort(inverse, kind='mergesort')]
+    starts = numpy.concatenate(([0], numpy.cumsum(count)[:-1]))
+    return ufunc.reduceat(ordered, starts)
+
+
+class GoodputBaseline():
+    """
+    Avalanche_Goodput_Baseline rows of a test on a testbed - (vlan, vlan2, runs, mean, m2, minGoodput, maxGoodput, lastRun) - indexed by (vlan, vlan2)
+    """
+
+    def __init__(self, rows):
+        self.rows = dict(((_to_int(row[0], 0), _to_int(row[1], 0)), row[2:]) for row in rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def align(self, vlans, vlans2):
+        """
+        Baseline columns lined up with the given VLANs - runs, mean, m2, min and max arrays plus the list of last runs (0/NaN/None where a VLAN has no baseline)
+        """
+        empty = (0, 0.0, 0.0, None, None, None)
+        rows = [self.rows.get((vlan, vlan2), empty) for vlan, vlan2 in zip(vlans, vlans2)]
+        runs = numpy.array([_to_int(row[0], 0) for row in rows], dtype=numpy.int64)
+        mean, m2, minimum, maximum = [numpy.array([numpy.nan if row[column] is None else float(row[column]) for row in rows], dtype=numpy.float64) for column in range(1, 5)]
+        return runs, numpy.nan_to_num(mean), numpy.nan_to_num(m2), minimum, maximum, [row[5] for row in rows]
+
+
+def welford_update(runs, mean, m2, values, update=None):
+    """
+    Fold one new value per element into running count/mean/m2 arrays (Welford) - update masks the elements to fold, returns the new arrays
+    """
+    if update is None:
+        update = ~numpy.isnan(values)
+    values = numpy.where(update, values, 0.0)
+    new_runs = runs + update
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        delta = values - mean
+        new_mean = numpy.where(update, mean + delta / new_runs, mean)
+        new_m2 = numpy.where(update, m2 + delta * (values - new_mean), m2)
+    return new_runs, new_mean, new_m2
+
+
+def goodput_regressions(goodput, runs, mean, m2, z_threshold=3.0, min_runs=5, min_drop=1.0):
+    """
+    Flag percent goodputs that regressed against running baselines (see welford_update)
+
+    A goodput regressed when it falls below the one sided prediction interval of its baseline - mean - t * std * sqrt(1 + 1/runs), with t the
+    Student t quantile matching z_threshold at runs - 1 degrees of freedom so baselines of only a few runs do not flag noise - by more than min_drop,
+    or has no goodput at all.
+    Returns the regressed mask, the baseline sample standard deviations and the z scores (NaN where there is no baseline or goodput)
+    """
+    compared = runs >= max(min_runs, 2)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        std = numpy.where(compared, numpy.sqrt(m2 / (runs - 1)), numpy.nan)
+        z_score = (goodput - mean) / std
+        margin = _t_quantile(z_threshold, runs - 1) * std * numpy.sqrt(1 + 1.0 / runs)
+        drop = mean - goodput
+        regressed = compared & ((drop > numpy.maximum(margin, min_drop)) | numpy.isnan(goodput))
+    return regressed, std, numpy.where(compared, z_score, numpy.nan)
+
+
+def _t_quantile(z, dof):
+    """
+    Student t quantile of the standard normal quantile z at dof degrees of freedom (Cornish-Fisher expansion, no scipy needed)
+    """
+    dof = numpy.asarray(dof, dtype=numpy.float64)
+    return (z + (z ** 3 + z) / (4 * dof) + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * dof ** 2)
+            + (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / (384 * dof ** 3))
+
+
+def goodput_rollups(results, columns, min_goodput=85.0):
+    """
+    Goodput rollups of a VlanStatsTable grouped by key columns (e.g. ['slot', 'pon'])
+
+    Returns {group key tuple: dict of 'vlans', 'failed' (VLANs under min_goodput percent or without a goodput), 'bytes_received' and 'goodput'
+    (sums of Bytes Received and Goodput[Http] Cumulative Receive) and 'min_goodput' (lowest percent goodput, None if no VLAN has one)}
+    """
+    keys, inverse = _group_index(results, columns)
+    if not keys or not len(inverse):
+        return dict()
+    goodput = goodput_percent(results)
+    with numpy.errstate(invalid='ignore'):
+        failed = ~(goodput >= min_goodput)
+    count = numpy.bincount(inverse, minlength=len(keys))
+    failed = numpy.bincount(inverse, weights=failed, minlength=len(keys))
+    bytes_received = numpy.bincount(inverse, weights=numpy.nan_to_num(results['Bytes Received']), minlength=len(keys))
+    goodput_sum = numpy.bincount(inverse, weights=numpy.nan_to_num(results['Goodput[Http] Cumulative Receive']), minlength=len(keys))
+    min_goodput = _group_reduce(numpy.minimum, numpy.where(numpy.isnan(goodput), numpy.inf, goodput), inverse, count)
+
+    rollups = dict()
+    for idx, key in enumerate(keys):
+        rollups[key] = {
+            'vlans': int(count[idx]),
+            'failed': int(failed[idx]),
+            'bytes_received': float(bytes_received[idx]),
+            'goodput': float(goodput_sum[idx]),
+            'min_goodput': float(min_goodput[idx]) if numpy.isfinite(min_goodput[idx]) else None,
+        }
+    return rollups
+
+
+def fairness_statistics(results, metric="Goodput[Http] Ave Receive Rate (bps)", columns=()):
+    """
+    Fairness of a metric across the VLANs of a VlanStatsTable, grouped by key columns (e.g. ['slot', 'pon']) - no columns groups the whole table
+
+    Returns {group key tuple: dict of 'vlans', 'mean', 'min', 'max', 'jain' (Jain's fairness index - (sum x)^2 / (n * sum x^2)),
+    'max_min' (max/min ratio, inf when the min is 0) and 'cov' (coefficient of variation - std/mean)}.
+    VLANs without a value are left out. Done with bincount/reduceat over the groups so it stays vectorized for any number of VLANs
+    """
+    values = results[metric]
+    measured = ~numpy.isnan(values)
+    values = values[measured]
+    if not len(values):
+        return dict()
+    keys, inverse = _group_index(results, columns, measured)
+
+    count = numpy.bincount(inverse)
+    total = numpy.bincount(inverse, weights=values)
+    squares = numpy.bincount(inverse, weights=values * values)
+    minimum = _group_reduce(numpy.minimum, values, inverse, count)
+    maximum = _group_reduce(numpy.maximum, values, inverse, count)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        mean = total / count
+        std = numpy.sqrt(numpy.maximum(squares / count - mean * mean, 0))
+        jain = total * total / (count * squares)
+        max_min = maximum / minimum
+        cov = std / mean
+
+    fairness = dict()
+    for idx, key in enumerate(keys):
+        fairness[key] = {
+            'vlans': int(count[idx]),
+            'mean': float(mean[idx]),
+            'min': float(minimum[idx]),
+            'max': float(maximum[idx]),
+            'jain': float(jain[idx]),
+            'max_min': float(max_min[idx]),
+            'cov': float(cov[idx]),
+        }
+    return fairness
+
+
+def _goodput_statistics_report(stats, min_goodput):
+    """
+    Summary_Results.txt lines of a goodput_statistics dict
+    """
+    report = ["[SUMMARY] VLANs: {0}; Passed: {1}; Failed: {2}; No Goodput: {3}; Expected Percent Goodput: {4}%".format(stats['vlans'], stats['passed'], stats['failed'], stats['no_goodput'], min_goodput)]
+    report.append("[STATS] Percent Goodput - Min: {0}%; Mean: {1}%; Max: {2}%; ".format(stats['min'], stats['mean'], stats['max'])
+                  + "; ".join("P{0}: {1}%".format(percentile, stats['percentiles'][percentile]) for percentile in GOODPUT_PERCENTILES))
+    for vlan, vlan2, vlan_goodput in stats['worst']:
+        report.append("[WORST] VLAN: {0} - Percent Goodput: {1}%".format(_vlan_str(vlan, vlan2), vlan_goodput))
+    return report
+
+
+def _vlan_str(vlan, vlan2):
+    """
+    'vlan' or 'vlan/vlan2' when there is an inner tag
+    """
+    return "{0}/{1}".format(vlan, vlan2) if vlan2 else str(vlan)
+
+
+def _goodput_percent(metrics):
+    """
+    Percent goodput of a VLAN - goodPutCumRcv/Bytes Received in bits, None when it cannot be computed
+    """
+    bytes_received = metrics.get('Bytes Received')
+    goodput_cum_received = metrics.get('Goodput[Http] Cumulative Receive')
+    if not bytes_received or goodput_cum_received is None:
+        return None
+    return round(goodput_cum_received / (bytes_received * 8.0) * 100, 2)
+
+
+def _to_number(value):
+    """
+    hostStats.csv field to float, None if it is empty or not numeric
+    """
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _number_str(value):
+    """
+    Format a metric for publishing - whole numbers without the trailing .0
+    """
+    if value is None:
+        return 'NULL'
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+def _sql_literal(value, backslash_escapes=True):
+    """
+    Python value to a MySQL literal - None/NaN to NULL, numbers as is, strings quoted with the MySQL escapes
+    (only the quotes doubled without backslash_escapes, for SQLite)
+    """
+    if value is None:
+        return 'NULL'
+    if isinstance(value, float):
+        if value != value:
+            return 'NULL'
+        return _number_str(value)
+    if isinstance(value, (int, long)):
+        return str(value)
+    if isinstance(value, unicode):
+        value = value.encode('utf-8')
+    value = str(value)
+    if not backslash_escapes:
+        return "'" + value.replace("'", "''") + "'"
+    for char, escaped in (('\\', '\\\\'), ('\0', '\\0'), ('\n', '\\n'), ('\r', '\\r'), ('\x1a', '\\Z'), ("'", "\\'"), ('"', '\\"')):
+        value = value.replace(char, escaped)
+    return "'" + value + "'"
+
+
+def _sql_row(values, backslash_escapes=True):
+    """
+    Tuple of Python values to a parenthesized MySQL row literal for multi-row INSERTs (see _sql_literal)
+    """
+    return "(" + ", ".join(_sql_literal(value, backslash_escapes) for value in values) + ")"
+
+
+class SQLiteDatabase():
+    """
+    Local SQLite results store behind the database.Database interface (db_connect, db_pull, db_push, db_close)
+
+    Holds the Avalanche_Test_Results and Vlan_Slot_Pon_Mapping tables in the central database's column order (see LOCAL_STORE_SCHEMA),
+    so the same statements run against either. Results published here carry a forwarded flag until Avalanche.forward_results sends them on
+    """
+    #SQLite does not understand the MySQL backslash escapes (see _sql_literal)
+    backslash_escapes = False
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = None
+
+    def db_connect(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        #DatabasePool hands a connection to one thread at a time, never two at once
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.text_factory = str
+        #write ahead log - publishing does not block readers and commits skip the full fsync
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        for statement in LOCAL_STORE_SCHEMA:
+            self.connection.execute(statement)
+        self.connection.commit()
+
+    def db_pull(self, sql_query):
+        rows = tuple(tuple(row) for row in self.connection.execute(sql_query).fetchall())
+        return (len(rows), rows)
+
+    def db_push(self, sql_query):
+        self.connection.execute(sql_query)
+        self.connection.commit()
+
+    def db_close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+class DatabasePool():
+    """
+    Reusable database.Database connections keyed by host/port/database/user, plus SQLiteDatabase connections keyed by path
+
+    Connections are checked out, used and released back to the pool instead of being opened and closed per call.
+    An idle connection is health checked with a 'SELECT 1' before it is handed out again, one that fails is closed and replaced.
+    Thread safe - every thread checks out its own connection
+    """
+
+    def __init__(self, max_idle=None, ping_interval=None):
+        self.max_idle = DB_POOL_MAX_IDLE if max_idle is None else max_idle
+        self.ping_interval = DB_POOL_PING_INTERVAL if ping_interval is None else ping_interval
+        #{(db_ip, db_port, db_database, db_username): [(release time, database.Database), ...]}
+        self.idle = dict()
+        self.lock = threading.Lock()
+
+    def connection(self, db_ip, db_port, db_database, db_username, db_pwd):
+        """
+        Check out a connection for a with block, released when the block exits (closed instead if the block raised)
+        """
+        return _DatabaseCheckout(self, (db_ip, db_port, db_database, db_username), db_pwd)
+
+    def local_connection(self, path):
+        """
+        Check out a connection to a local SQLite results store for a with block (see SQLiteDatabase)
+        """
+        return _DatabaseCheckout(self, (LOCAL_STORE, os.path.abspath(path), None, None), None)
+
+    def checkout(self, db_ip, db_port, db_database, db_username, db_pwd):
+        """
+        Get a connected database.Database - an idle pooled one if it is still healthy, else a new connection
+        """
+        return self._checkout((db_ip, db_port, db_database, db_username), db_pwd)
+
+    def _checkout(self, key, db_pwd):
+        label = key[1] if key[0] == LOCAL_STORE else "{0}:{1}/{2}".format(*key)
+        while True:
+            with self.lock:
+                idle = self.idle.get(key)
+                if not idle:
+                    break
+                released, db = idle.pop()
+            if time.time() - released < self.ping_interval or self._healthy(db):
+                return db
+            logging.warning("[DB.WARNING]: DB POOL; {0}; stale connection dropped".format(label))
+            self._close(db)
+        if key[0] == LOCAL_STORE:
+            db = SQLiteDatabase(key[1])
+        else:
+            db = database.Database(*(key + (db_pwd,)))
+        db.db_connect()
+        db._pool_key = key
+        logging.info("[DB.INFO]: DB POOL; {0}; connected".format(label))
+        return db
+
+    def release(self, db, discard=False):
+        """
+        Return a checked out connection to the pool - discard closes it instead (e.g. after an error left it in an unknown state)
+        """
+        if not discard:
+            with self.lock:
+                idle = self.idle.setdefault(db._pool_key, list())
+                if len(idle) < self.max_idle:
+                    idle.append((time.time(), db))
+                    return
+        self._close(db)
+
+    def close_all(self):
+        """
+        Close every idle pooled connection
+        """
+        with self.lock:
+            idle, self.idle = self.idle, dict()
+        for connections in idle.values():
+            for released, db in connections:
+                self._close(db)
+
+    def _healthy(self, db):
+        try:
+            db.db_pull("SELECT 1")
+            return True
+        except Exception, e:
+            logging.debug("[DB.DEBUG]: DB POOL; health check failed; {0}".format(e))
+            return False
+
+    def _close(self, db):
+        try:
+            db.db_close()
+        except Exception, e:
+            logging.debug("[DB.DEBUG]: DB POOL; close failed; {0}".format(e))
+
+
+class _DatabaseCheckout():
+    """
+    with block wrapper around DatabasePool.checkout/release
+    """
+
+    def __init__(self, pool, key, db_pwd):
+        self.pool = pool
+        self.key = key
+        self.db_pwd = db_pwd
+        self.db = None
+
+    def __enter__(self):
+        self.db = self.pool._checkout(self.key, self.db_pwd)
+        return self.db
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.pool.release(self.db, discard=exc_type is not None)
+        self.db = None
+
+
+#connections shared by publishing, VLAN mapping lookups and analysis for the whole session
+_database_pool = DatabasePool()
+atexit.register(_database_pool.close_all)
+
+
+def _results_filter(test_run, avalanche_test_name, mode="", slot="", pon="", backslash_escapes=True):
+    """
+    Avalanche_Test_Results WHERE clause of a test run - exact match on testRun/testName, plus slot (mode 'slot') or slot and pon (default mode), mode 'sm' takes the whole run
+    """
+    sql_filter = "`testRun` = {0} AND `testName` = {1}".format(_sql_literal(test_run, backslash_escapes), _sql_literal(avalanche_test_name, backslash_escapes))
+    if mode.lower() == "sm":
+        return sql_filter
+    sql_filter += " AND `slot` = {0}".format(_sql_literal(_to_int(slot, slot), backslash_escapes))
+    if mode.lower() == "slot":
+        return sql_filter
+    return sql_filter + " AND `pon` = {0}".format(_sql_literal(_to_int(pon, pon), backslash_escapes))
+
+
+def _row_batches(results, batch_size=None):
+    """
+    Split the rows of a VlanStatsTable into lists of at most batch_size rows (default: PUBLISH_BATCH_SIZE)
+    """
+    batch_size = batch_size or PUBLISH_BATCH_SIZE
+    if batch_size < 1:
+        raise AssertionError("[DB.ERROR]: DB PUBLISH; batch_size: {0}; must be at least 1".format(batch_size))
+    rows = iter(results.rows())
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def _vlan_mapping_query(testbed, local, backslash_escapes=None):
+    """
+    Vlan_Slot_Pon_Mapping query of a testbed - the local store holds explicit Vlan/vlan2/Slot/Pon/Port columns, the central table is
+    read as the Vlan/vlan2 keys up front followed by the full row (slot, pon and port at 3, 4 and 9)
+    """
+    if backslash_escapes is None:
+        backslash_escapes = not local
+    if local:
+        return "SELECT `Vlan`, `vlan2`, `Slot`, `Pon`, `Port` FROM `Vlan_Slot_Pon_Mapping` WHERE `TestBed` = {0}".format(_sql_literal(testbed, backslash_escapes))
+    return "SELECT `Vlan`, `vlan2`, `Vlan_Slot_Pon_Mapping`.* FROM `Vlan_Slot_Pon_Mapping` WHERE `TestBed` = {0}".format(_sql_literal(testbed, backslash_escapes))
+
+
+def _vlan_mapping_entry(row, local):
+    """
+    (vlan, vlan2, slot, pon, port) of a _vlan_mapping_query row
+    """
+    if local:
+        return tuple(row[:5])
+    return (row[0], row[1], row[2 + 3], row[2 + 4], row[2 + 9])
+
+
+def map_slot_pon_port(results, vlan_mapping):
+    """
+    Fill in slot/pon/port of a VlanStatsTable from a VLAN mapping (see Avalanche.get_vlan_mapping)
+
+    Returns the table of the mapped VLANs and the list of VLANs ('vlan' or 'vlan/vlan2') without a mapping entry, which are dropped
+    """
+    mapped = numpy.zeros(len(results), dtype=bool)
+    missing = list()
+    for idx, (vlan, vlan2) in enumerate(zip(results['vlan'].tolist(), results['vlan2'].tolist())):
+        #no inner tag matches on the outer VLAN alone
+        slot_pon_port = vlan_mapping.get((vlan, vlan2 if vlan2 else None))
+        if slot_pon_port is None:
+            missing.append(_vlan_str(vlan, vlan2))
+            continue
+        results['slot'][idx], results['pon'][idx], results['port'][idx] = slot_pon_port
+        mapped[idx] = True
+    return results.take(mapped), missing
+
+
+class PublishPipeline():
+    """
+    Background publisher threads draining row batches from a bounded queue into Avalanche_Test_Results
+
+    put blocks once queue_size batches are waiting so parsing never runs unboundedly ahead of the database.
+    The first publish error stops every publisher and is raised from the next put or from join, abort drops whatever is still queued
+    """
+
+    def __init__(self, avalanche, avalanche_test_name, db_ip="10.21.1.181", db_port=3306, publishers=None, queue_size=None):
+        self.avalanche = avalanche
+        self.avalanche_test_name = avalanche_test_name
+        self.db_ip = db_ip
+        self.db_port = db_port
+        self.queue = Queue.Queue(queue_size or PUBLISH_QUEUE_SIZE)
+        self.stopped = threading.Event()
+        self.error = None
+        self.published = 0
+        self.lock = threading.Lock()
+        self.threads = list()
+        for idx in range(publishers or PUBLISH_THREADS):
+            thread = threading.Thread(target=self._publish, name="AvalanchePublisher-{0}".format(idx))
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def put(self, rows):
+        """
+        Queue a batch of VlanStatsTable rows for publishing, waiting for room in the queue
+        """
+        self._put(rows)
+
+    def join(self):
+        """
+        Flush everything queued, stop the publishers and return the number of rows published
+        """
+        for thread in self.threads:
+            self._put(None)
+        for thread in self.threads:
+            thread.join()
+        self._raise_error()
+        logging.info("[DB.INFO]: DB PUBLISH; testRun: {0}; published: {1}".format(self.avalanche.test_run, self.published))
+        return self.published
+
+    def abort(self):
+        """
+        Stop the publishers without flushing what is still queued
+        """
+        self.stopped.set()
+        for thread in self.threads:
+            thread.join()
+
+    def _put(self, item):
+        while True:
+            self._raise_error()
+            try:
+                self.queue.put(item, timeout=0.5)
+                return
+            except Queue.Full:
+                pass
+
+    def _raise_error(self):
+        if self.error is not None:
+            raise AssertionError("[DB.ERROR]: DB PUBLISH; testRun: {0}; {1}".format(self.avalanche.test_run, self.error))
+
+    def _publish(self):
+        try:
+            with self.avalanche._results_db_connection(self.db_ip, self.db_port) as db_traffic:
+                while not self.stopped.is_set():
+                    try:
+                        rows = self.queue.get(timeout=0.5)
+                    except Queue.Empty:
+                        continue
+                    if rows is None:
+                        return
+                    published = self.avalanche._publish_rows(db_traffic, rows, self.avalanche_test_name)
+                    with self.lock:
+                        self.published += published
+        except Exception, e:
+            logging.error("[DB.ERROR]: DB PUBLISH; {0}; {1}".format(threading.current_thread().name, e))
+            with self.lock:
+                if self.error is None:
+                    self.error = e
+            self.stopped.set()
+
+
+def _to_int(value, default=-1):
+    """
+    DB/hostStats.csv value to int, default if it is missing or not numeric (e.g. port 'None')
+    """
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+class VlanStatsTable():
+    """
+    Columnar per VLAN statistics table backed by typed NumPy arrays
+
+    args = {
+                metrics: list of metric names, each carried as a float64 column
+                columns: dict of column name -> array (default: an empty table)
+            }
+
+    Key columns are vlan, vlan2 (0 when there is no inner tag), slot, pon and port (int32, -1 until mapped or when unknown).
+    Metric columns are NaN where a metric was not found.
+    """
+    KEY_COLUMNS = ['vlan', 'vlan2', 'slot', 'pon', 'port']
+
+    def __init__(self, metrics=None, columns=None):
+        """
+        Class initialization
+        """
+        self.metrics = list(metrics or DEFAULT_METRICS)
+        if columns is None:
+            columns = dict((name, numpy.zeros(0, dtype=numpy.int32)) for name in self.KEY_COLUMNS)
+            columns.update((name, numpy.zeros(0)) for name in self.metrics)
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.columns['vlan'])
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def take(self, index):
+        """
+        New table of the rows selected by a boolean mask or index array
+        """
+        return VlanStatsTable(self.metrics, dict((name, column[index]) for name, column in self.columns.items()))
+
+    def rows(self):
+        """
+        Iterate (vlan, vlan2, slot, pon, port, metric values...) tuples of Python values
+        """
+        return zip(*[self.columns[name].tolist() for name in self.KEY_COLUMNS + self.metrics])
+
+
+class _VlanStatsTableBuilder():
+    """
+    Appends VLAN rows to compact typed buffers and turns them into a VlanStatsTable in one copy
+    """
+
+    def __init__(self, metrics):
+        self.metrics = list(metrics)
+        self.keys = dict((name, array.array('l')) for name in VlanStatsTable.KEY_COLUMNS)
+        self.values = dict((name, array.array('d')) for name in self.metrics)
+
+    def append(self, vlan, vlan2, metrics, slot=-1, pon=-1, port=-1):
+        for name, value in zip(VlanStatsTable.KEY_COLUMNS, (vlan, vlan2, slot, pon, port)):
+            self.keys[name].append(value)
+        for name in self.metrics:
+            value = metrics.get(name)
+            self.values[name].append(numpy.nan if value is None else value)
+
+    def table(self):
+        columns = dict((name, numpy.array(buf, dtype=numpy.int32)) for name, buf in self.keys.items())
+        columns.update((name, numpy.array(buf, dtype=numpy.float64)) for name, buf in self.values.items())
+        return VlanStatsTable(self.metrics, columns)
+
+
+def parse_client_results(client_results, my_subnet="10.213.", metrics=None, use_mmap=False, use_cache=True):
+    """
+    Parse one client side hostStats.csv file into a VlanStatsTable of the VLAN blocks containing my_subnet (see iter_vlan_blocks)
+
+    With use_cache the table is saved next to the file (hostStats.csv.cache.npz) and loaded from there instead of parsing again,
+    for as long as the file path, size and mtime and the parse settings (my_subnet, metrics) match - anything else invalidates it
+    """
+    metrics = list(metrics or DEFAULT_METRICS)
+    cache_file = client_results + ".cache.npz"
+    if use_cache:
+        cache_key = _results_cache_key(client_results, my_subnet, metrics)
+        table = _load_results_cache(cache_file, cache_key)
+        if table is not None:
+            return table
+    builder = _VlanStatsTableBuilder(metrics)
+    for vlan_block in iter_vlan_blocks(client_results, my_subnet, metrics, use_mmap):
+        if vlan_block.subnet_match:
+            builder.append(int(vlan_block.vlan), int(vlan_block.vlan2 or 0), vlan_block.metrics)
+    table = builder.table()
+    if use_cache:
+        _save_results_cache(cache_file, cache_key, table)
+    return table
+
+
+def _results_cache_key(client_results, my_subnet, metrics):
+    """
+    Identity of a parsed hostStats.csv - the file path/size/mtime plus a hash of the parse settings
+    """
+    schema_hash = hashlib.sha1(repr((RESULTS_CACHE_VERSION, my_subnet, metrics))).hexdigest()
+    return "{0}|{1}".format(_file_identity(client_results), schema_hash)
+
+
+def _file_identity(filepath):
+    """
+    path|size|mtime identity of a file - changes whenever the file is rewritten or appended to
+    """
+    stat = os.stat(filepath)
+    return "{0}|{1}|{2!r}".format(os.path.abspath(filepath), stat.st_size, stat.st_mtime)
+
+
+def _load_results_cache(cache_file, cache_key):
+    """
+    Load a VlanStatsTable from a results cache file, None if there is none or it is stale
+    """
+    if not os.path.isfile(cache_file):
+        return None
+    try:
+        with numpy.load(cache_file) as cached:
+            if str(cached['key']) != cache_key:
+                logging.info("[AVALANCHE.RESULTS]: {0}; results cache is stale".format(cache_file))
+                return None
+            names = cached['names'].tolist()
+            columns = dict((name, cached['column_{0}'.format(idx)]) for idx, name in enumerate(names))
+            metrics = [name for name in names if name not in VlanStatsTable.KEY_COLUMNS]
+    except Exception, e:
+        logging.warning("[AVALANCHE.RESULTS]: {0}; unreadable results cache; {1}".format(cache_file, e))
+        return None
+    logging.info("[AVALANCHE.RESULTS]: {0}; loaded from results cache".format(cache_file))
+    return VlanStatsTable(metrics, columns)
+
+
+def _save_results_cache(cache_file, cache_key, table):
+    """
+    Save a VlanStatsTable to a results cache file - a failed write only costs the next run a parse
+    """
+    names = VlanStatsTable.KEY_COLUMNS + table.metrics
+    arrays = dict(('column_{0}'.format(idx), table[name]) for idx, name in enumerate(names))
+    try:
+        fh, temp_file = mkstemp(dir=os.path.dirname(cache_file) or None)
+        with os.fdopen(fh, 'wb') as new_file:
+            numpy.savez(new_file, key=numpy.array(cache_key), names=numpy.array(names), **arrays)
+        _atomic_replace(temp_file, cache_file)
+    except EnvironmentError, e:
+        logging.warning("[AVALANCHE.RESULTS]: {0}; results cache not written; {1}".format(cache_file, e))
+
+
+def _parse_client_results_job(job):
+    """
+    Process pool entry point for parse_client_results - job is a (client_results, my_subnet, metrics, use_mmap, use_cache) tuple
+    """
+    return parse_client_results(*job)
+
+
+def concat_vlan_stats_tables(tables, metrics=None):
+    """
+    Stack VlanStatsTables with the same metrics into one, in the order given
+    """
+    tables = [table for table in tables if len(table)]
+    if not tables:
+        return VlanStatsTable(metrics)
+    return VlanStatsTable(tables[0].metrics, dict((name, numpy.concatenate([table[name] for table in tables])) for name in tables[0].columns))
+
+
+def vlan_stats_table_from_results(rows):
+    """
+    Build a VlanStatsTable from Avalanche_Test_Results rows
+    (`id`, `testRun`, `testName`, `vlan`, `vlan2`, `slot`, `pon`, `port`, `bytesReceived`, `goodPutCumRcv`, `goodputAvgRcvRate`, `timestamp`)
+    """
+    builder = _VlanStatsTableBuilder(DEFAULT_METRICS)
+    for row in rows:
+        metrics = dict(zip(DEFAULT_METRICS, [None if value is None else float(value) for value in row[8:11]]))
+        builder.append(_to_int(row[3], 0), _to_int(row[4], 0), metrics, _to_int(row[5]), _to_int(row[6]), _to_int(row[7]))
+    return builder.table()
+
+
+class TestRunResults():
+    """
+    A test run's Avalanche_Test_Results rows held in memory, indexed by slot, slot/pon and slot/pon/port
+
+    args = {
+                test_run: the test run id the rows were published under
+                avalanche_test_name: the Avalanche test name
+                results: VlanStatsTable of the rows (see vlan_stats_table_from_results)
+            }
+
+    Serves the analyze_goodput mode views (see view) without going back to the database
+    """
+
+    def __init__(self, test_run, avalanche_test_name, results):
+        self.test_run = test_run
+        self.avalanche_test_name = avalanche_test_name
+        self.results = results
+        #{key tuple: index array of its rows}
+        self.slots = _group_rows(results, ['slot'])
+        self.pons = _group_rows(results, ['slot', 'pon'])
+        self.ports = _group_rows(results, ['slot', 'pon', 'port'])
+
+    def __len__(self):
+        return len(self.results)
+
+    def view(self, mode="", slot="", pon="", port=None):
+        """
+        VlanStatsTable of the rows a mode selects - 'sm' the whole run, 'slot' one slot, default one slot/pon (one slot/pon/port if port is given)
+        """
+        if mode.lower() == "sm":
+            return self.results
+        if mode.lower() == "slot":
+            index = self.slots.get((_to_int(slot),))
+        elif port is None:
+            index = self.pons.get((_to_int(slot), _to_int(pon)))
+        else:
+            index = self.ports.get((_to_int(slot), _to_int(pon), _to_int(port)))
+        if index is None:
+            index = numpy.zeros(0, dtype=numpy.intp)
+        return self.results.take(index)
+
+
+def _group_rows(results, columns):
+    """
+    Group the rows of a VlanStatsTable by columns - {key tuple: index array of its rows, in table order}
+    """
+    groups = dict()
+    for idx, key in enumerate(zip(*[results[name].tolist() for name in columns])):
+        groups.setdefault(key, list()).append(idx)
+    return dict((key, numpy.array(index, dtype=numpy.intp)) for key, index in groups.items())
+
+
+def _variant_label(params, edits):
+    """
+    File name label of a config variant - the params with their values, associations as all, none or the number of subnets enabled
+    """
+    labels = list()
+    for param, edit in zip(params, edits):
+        if edit[0] == 'associations':
+            subnets = edit[1]
+            value = "all" if subnets is None else "{0}subnets".format(len(subnets)) if subnets else "none"
+        else:
+            value = edit[2]
+        labels.append("{0}-{1}".format(param, re.sub('[^\w.-]', '', value)))
+    return "_".join(labels)
+
+
+#ConfigModel of the base config.tcl in a generate_config_variants worker process
+_variant_model = None
+
+
+def _init_config_variant_worker(data):
+    """
+    generate_config_variants worker initializer - parse the base config.tcl contents once per process
+    """
+    global _variant_model
+    _variant_model = ConfigModel(data)
+
+
+def _write_config_variant_job(job):
+    """
+    generate_config_variants worker - job is (edits, variant_file)
+    """
+    _write_config_variant(_variant_model, job[0], job[1])
+
+
+def _write_config_variant(model, edits, variant_file):
+    """
+    Apply edits to a ConfigModel without modifying it and write the result to variant_file
+    """
+    fh, temp_file = mkstemp(dir=os.path.dirname(variant_file))
+    try:
+        with os.fdopen(fh, 'wb') as new_file:
+            new_file.write(model.serialize(model.apply_edits(edits, log=False)))
+        _atomic_replace(temp_file, variant_file)
+    except:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+
+
+def _atomic_replace(src, dst):
+    """
+    Replace dst with src in a single rename - MoveFileEx on Windows where os.rename will not overwrite
+    """
+    if hasattr(os, 'replace'):
+        os.replace(src, dst)
+    elif os.name == 'nt':
+        import ctypes
+        #MOVEFILE_REPLACE_EXISTING | MOVEFILE_WRITE_THROUGH
+        if not ctypes.windll.kernel32.MoveFileExW(unicode(src), unicode(dst), 0x1 | 0x8):
+            raise ctypes.WinError()
+    else:
+        os.rename(src, dst)
 
 
 if __name__ == '__main__':